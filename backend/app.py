@@ -1,25 +1,34 @@
 # backend/app.py
 
 import os
+import re
+import atexit
 import uuid
-import json
 import time
 import logging
+import hashlib
+import functools
+import mimetypes
+import tempfile
+import threading
 from flask import (
-    Flask, session, redirect,
+    Flask, Request, g, session, redirect,
     render_template, request, jsonify,
-    send_from_directory, Response
+    send_from_directory, Response, abort
 )
-from database import init_db, get_db
+from database import init_db, get_db, import_file_map_json
 from auth import register_user, authenticate_user, validate_password
 from chat_store import (
-    save_message,
+    save_messages,
     load_conversation as db_load_conversation,
     list_sessions,
     load_session_messages,
+    conversation_version,
 )
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 from flask_limiter import Limiter
@@ -41,8 +50,31 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 
+# Attempt to import orjson for faster JSON responses
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+
+# Attempt to import Redis-backed session support safely
+try:
+    import redis
+    from flask_session import Session
+except Exception:
+    redis = None
+    Session = None
+
+
+# Shared Redis connection for sessions and rate limits (optional)
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
+redis_client = redis.Redis.from_url(REDIS_URL) if REDIS_URL and redis else None
+if REDIS_URL and redis_client is None:
+    logger.warning("REDIS_URL set but redis/flask-session not installed – using defaults")
+
+
 # Import model wrapper and utility functions used for text extraction and processing
-from model_wrapper import get_wrapper  # noqa: E402
+from model_wrapper import get_wrapper, CHAT_HISTORY_TURNS  # noqa: E402
 from utils import (  # noqa: E402
     extract_text_from_pdf,
     extract_text_from_docx,
@@ -50,9 +82,54 @@ from utils import (  # noqa: E402
     extract_text_from_csv_or_excel,
     extract_text_from_image,
     explain_pdf,
+    explain_pdf_stream,
     summarize_text,
     extract_keywords,
 )
+import ocr  # noqa: E402
+
+
+# Process umask, read once at import (changing it later is not thread-safe)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+# Spool multipart file parts straight into the upload folder so a finished
+# upload can be hard-linked into place instead of copied out of /tmp
+class UploadRequest(Request):
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        return tempfile.NamedTemporaryFile(
+            "wb+", dir=app.config["UPLOAD_FOLDER"], prefix=".part-"
+        )
+
+
+# Hash the static assets so every worker (and host) derives the same version
+def _static_fingerprint(folder):
+    digest = hashlib.md5()
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, folder).encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:8]
+
+
+# JSON provider that serializes responses with orjson
+class OrjsonProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 
 # Initialize Flask application with frontend paths
@@ -61,35 +138,51 @@ app = Flask(
     static_folder="../frontend/static",
     template_folder="../frontend/templates",
 )
+app.request_class = UploadRequest
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 # Enable Cross-Origin Resource Sharing
 CORS(app)
 
-# Enable CSRF protection (exempt JSON API endpoints where appropriate)
+# Enable CSRF protection (exempt JSON API endpoints where appropriate).
+# The raw token is generated once per session either way; a signed token
+# stays valid for CSRF_TIME_LIMIT seconds (default one day, instead of
+# Flask-WTF's hour) so a page left open through a working day can still
+# submit, while a leaked token still expires.
+app.config["WTF_CSRF_TIME_LIMIT"] = int(os.getenv("CSRF_TIME_LIMIT") or "86400")
 csrf = CSRFProtect(app)
 
 # Make `csrf_token()` available in Jinja templates
 app.jinja_env.globals["csrf_token"] = generate_csrf
 
+# Declare rate-limit storage before the limiter reads its config. Counters
+# must be shared (Redis) for limits to hold across gunicorn/uvicorn workers.
+app.config.update(
+    RATELIMIT_STORAGE_URI=os.getenv("RATELIMIT_STORAGE_URI")
+    or (REDIS_URL if redis_client is not None else "memory://")
+)
+if app.config["RATELIMIT_STORAGE_URI"] == "memory://":
+    logger.info("Rate limits use in-memory storage (per worker); set REDIS_URL to share them")
+
 # Rate limiter to protect endpoints from abuse
 limiter = Limiter(get_remote_address, app=app, default_limits=["200 per hour"])
 
-# Disable static file caching and set upload size limit
-app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
+# Set upload size limit and the asset version used to cache-bust static URLs
 app.config["MAX_CONTENT_LENGTH"] = 20 * 1024 * 1024
-app.jinja_env.globals["static_version"] = str(int(time.time()))
+app.jinja_env.globals["static_version"] = os.getenv("GIT_SHA", "")[:12] or _static_fingerprint(app.static_folder)
 
 # Session secret (required for login)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev-secret-key")
 
+# Keep session state in Redis when available; the cookie only carries an id
+if redis_client is not None:
+    app.config.update(SESSION_TYPE="redis", SESSION_REDIS=redis_client)
+    Session(app)
+
 # Initialize database tables
 init_db()
 
-# Explicitly declare rate-limit storage (dev-safe)
-app.config.update(
-    RATELIMIT_STORAGE_URI="memory://"
-)
-
 # Determine a safe, OS-independent directory for persistent storage
 def get_storage_dir():
     name = "ai-learning-assistant"
@@ -117,15 +210,27 @@ FILES_DIR = os.path.join(STORAGE_DIR, "files")
 os.makedirs(CONVERSATIONS_DIR, exist_ok=True)
 os.makedirs(FILES_DIR, exist_ok=True)
 
+# Keep cached OCR text in the private storage dir unless OCR_CACHE_DIR is set
+if not ocr.OCR_CACHE_DIR:
+    ocr.OCR_CACHE_DIR = os.path.join(STORAGE_DIR, "ocr-cache")
+
+# Carry over upload mappings recorded by versions that wrote file_map.json
+import_file_map_json(os.path.join(STORAGE_DIR, "file_map.json"))
+
 
 # Configure upload directory used by Flask
 UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
+# Let a front-end server transfer files with sendfile(2): Apache/lighttpd via
+# X-Sendfile, nginx via X-Accel-Redirect to an internal location for uploads
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
+UPLOADS_ACCEL_PREFIX = os.getenv("UPLOADS_ACCEL_PREFIX", "").rstrip("/")
+
 
 # Define allowed file extensions for uploads
-ALLOWED_EXTENSIONS = {
+ALLOWED_EXTENSIONS = frozenset({
     "pdf",
     "txt",
     "docx",
@@ -141,39 +246,92 @@ ALLOWED_EXTENSIONS = {
     "json",
     "md",
     "webm",
-}
+})
+
+
+# Extensions whose text can be extracted (everything uploadable except audio)
+TEXT_EXTENSIONS = ALLOWED_EXTENSIONS - {"webm"}
+
+
+# Return the lower-cased extension of a file name ("" when there is none)
+def _file_ext(filename: str) -> str:
+    _, dot, ext = filename.rpartition(".")
+    return ext.lower() if dot else ""
 
 
 # Validate file extension before accepting upload
 def allowed_file(filename: str) -> bool:
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    return _file_ext(filename) in ALLOWED_EXTENSIONS
 
 
 
 
-# Return path to file mapping metadata
-def _file_map_path():
-    return os.path.join(STORAGE_DIR, "file_map.json")
+# Pending file-map rows, written to SQLite in batches off the request path
+FILE_MAP_FLUSH_INTERVAL = 2.0
+_file_map_pending = {}
+_file_map_lock = threading.Lock()
+_file_map_dirty = threading.Event()
 
 
 # Store original file names mapped to generated unique names
 def save_file_mapping(original_name, unique_name):
-    mapping = {}
-    path = _file_map_path()
-    if os.path.exists(path):
+    with _file_map_lock:
+        _file_map_pending[original_name] = (unique_name, time.time())
+    _file_map_dirty.set()
+
+
+# Write all pending file-map rows in one transaction
+def flush_file_mappings():
+    with _file_map_lock:
+        rows = [(o, u, ts) for o, (u, ts) in _file_map_pending.items()]
+        _file_map_pending.clear()
+    if not rows:
+        return
+
+    try:
+        with get_db() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO file_map (original, unique_name, ts) VALUES (?, ?, ?)",
+                rows
+            )
+    except Exception:
+        # Put the rows back (unless superseded) so the next flush retries them
+        with _file_map_lock:
+            for o, u, ts in rows:
+                _file_map_pending.setdefault(o, (u, ts))
+        _file_map_dirty.set()
+        raise
+
+
+# Background loop coalescing bursts of uploads into periodic flushes
+def _file_map_flusher():
+    while True:
+        _file_map_dirty.wait()
+        time.sleep(FILE_MAP_FLUSH_INTERVAL)
+        _file_map_dirty.clear()
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                mapping = json.load(f)
-        except Exception:
-            mapping = {}
+            flush_file_mappings()
+        except Exception as e:
+            logger.exception("file map flush failed: %s", e)
+
 
-    mapping[original_name] = {
-        "unique_name": unique_name,
-        "timestamp": time.time(),
-    }
+threading.Thread(target=_file_map_flusher, name="file-map-flush", daemon=True).start()
+atexit.register(flush_file_mappings)
 
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(mapping, f, indent=2)
+
+# Return this request's database connection (the thread's shared one)
+def _db():
+    if "db" not in g:
+        g.db = get_db()
+    return g.db
+
+
+# Discard anything a failed request left uncommitted; the connection stays open
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop("db", None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
 
 
 # Initialize AI model wrapper instance
@@ -194,8 +352,8 @@ def ping():
     return jsonify({"status": "ok"})
 
 
-@limiter.limit("5 per minute")
 @app.route("/login", methods=["GET", "POST"])
+@limiter.limit("5 per minute", methods=["POST"])
 def login():
     if request.method == "GET":
         return render_template("login.html")
@@ -203,7 +361,7 @@ def login():
     email = request.form.get("email", "").strip()
     password = request.form.get("password", "")
 
-    user_id = authenticate_user(email, password)
+    user_id = authenticate_user(email, password, conn=_db())
     if not user_id:
         return render_template("login.html", error="Invalid email or password")
 
@@ -212,8 +370,8 @@ def login():
     return redirect("/")
 
 
-@limiter.limit("3 per minute")
 @app.route("/signup", methods=["GET", "POST"])
+@limiter.limit("3 per minute", methods=["POST"])
 def signup():
     if request.method == "GET":
         return render_template("signup.html")
@@ -225,7 +383,7 @@ def signup():
     if not ok:
         return render_template("signup.html", error=error)
 
-    user_id = register_user(email, password)
+    user_id = register_user(email, password, conn=_db())
     if not user_id:
         return render_template("signup.html", error="User already exists")
 
@@ -242,8 +400,8 @@ def logout():
 
 # Handle standard chat requests (non-streaming)
 @csrf.exempt
-@limiter.limit("30 per minute")
 @app.route("/chat", methods=["POST"])
+@limiter.limit("30 per minute")
 def chat():
     data = request.get_json() or {}
     user_input = (data.get("message") or "").strip()
@@ -253,7 +411,10 @@ def chat():
     if not user_id:
         return jsonify({"response": "Login required"}), 401
 
-    history = load_session_messages(user_id, session_id) if session_id else []
+    history = (
+        load_session_messages(user_id, session_id, conn=_db(), limit=CHAT_HISTORY_TURNS)
+        if session_id else []
+    )
 
     if not user_input:
         return jsonify({"response": "(error) No input provided."})
@@ -262,12 +423,12 @@ def chat():
         title = user_input.strip()[:60]
         session_id = str(uuid.uuid4())
         try:
-            with get_db() as conn:
-                conn.execute(
-                    "INSERT INTO chat_sessions (id, user_id, title, created_at) VALUES (?, ?, ?, ?)",
-                    (session_id, user_id, title, int(time.time()))
-                )
-                conn.commit()
+            conn = _db()
+            conn.execute(
+                "INSERT INTO chat_sessions (id, user_id, title, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, user_id, title, int(time.time() * 1000))
+            )
+            conn.commit()
         except Exception as e:
             return jsonify({"response": f"(error) {e}"})
 
@@ -294,8 +455,12 @@ def chat():
         # Persist messages to database for multi-user support. We save the
         # user's input and the assistant's reply to the DB for the current
         # authenticated user.
-        save_message(user_id, "user", user_input, session_id=session_id)
-        save_message(user_id, "assistant", bot_response, session_id=session_id)
+        save_messages(
+            user_id,
+            session_id,
+            [("user", user_input), ("assistant", bot_response)],
+            conn=_db(),
+        )
 
         return jsonify({"session_id": session_id, "response": bot_response})
     except Exception as e:
@@ -303,10 +468,20 @@ def chat():
         return jsonify({"response": f"(error) {e}"})
 
 
+# Split streamed text into sentence-sized pieces (each ends at punctuation
+# or a newline when one is present)
+_SSE_SPLIT = re.compile(r"[^.?!\n]*[.?!\n]|[^.?!\n]+")
+
+
+# Format text as one Server-Sent Events message (multi-line safe)
+def _sse_event(text):
+    return "".join(f"data: {line}\n" for line in text.split("\n")) + "\n"
+
+
 # Handle chat responses using Server-Sent Events streaming
 @csrf.exempt
-@limiter.limit("30 per minute")
 @app.route("/stream_chat", methods=["POST"])
+@limiter.limit("30 per minute")
 def stream_chat():
     data = request.get_json() or {}
     user_input = (data.get("message") or "").strip()
@@ -316,30 +491,41 @@ def stream_chat():
     if not user_id:
         return jsonify({"response": "Login required"}), 401
 
-    history = load_session_messages(user_id, session_id) if session_id else []
+    history = (
+        load_session_messages(user_id, session_id, conn=_db(), limit=CHAT_HISTORY_TURNS)
+        if session_id else []
+    )
 
     if not user_input:
         return jsonify({"response": "(error) No input provided."})
 
-    if hasattr(wrapper, "chat_response"):
-        full = wrapper.chat_response(user_input, history=history)
-    else:
-        full = "(error) Model wrapper not available."
-
-    save_message(user_id, "user", user_input, session_id=session_id)
-    save_message(user_id, "assistant", full, session_id=session_id)
-
     def gen():
-        import re
-        parts = re.split(r"(\\.|\\?|!|\\n)", full)
+        if hasattr(wrapper, "chat_response_stream"):
+            tokens = wrapper.chat_response_stream(user_input, history=history)
+        else:
+            tokens = iter(["(error) Model wrapper not available."])
+
+        parts = []
         buf = ""
-        for p in parts:
-            buf += p
-            if len(buf) > 120:
-                yield f"data: {buf.strip()}\\n\\n"
-                buf = ""
+        for token in tokens:
+            parts.append(token)
+            for m in _SSE_SPLIT.finditer(token):
+                piece = m.group()
+                buf += piece
+                if len(buf) > 40 or piece.endswith((".", "!", "?", "\n")):
+                    yield _sse_event(buf)
+                    buf = ""
         if buf:
-            yield f"data: {buf.strip()}\\n\\n"
+            yield _sse_event(buf)
+
+        try:
+            save_messages(
+                user_id,
+                session_id,
+                [("user", user_input), ("assistant", "".join(parts))],
+            )
+        except Exception as e:
+            logger.exception("stream_chat save error: %s", e)
 
     return Response(gen(), content_type="text/event-stream")
 
@@ -356,10 +542,12 @@ def api_summarize():
         return jsonify({"summary": "(error) No text provided."})
 
     try:
+        # Cached responses are per user; anonymous calls are not cached
+        scope = session.get("user_id")
         summary = (
-            wrapper.summarize(text, bullets=bullets)
+            wrapper.summarize(text, bullets=bullets, cache_scope=scope)
             if hasattr(wrapper, "summarize")
-            else summarize_text(text, bullets)
+            else summarize_text(text, bullets, cache_scope=scope)
         )
         return jsonify({"summary": summary})
     except Exception as e:
@@ -378,16 +566,29 @@ def api_keywords():
         return jsonify({"keywords": []})
 
     try:
+        scope = session.get("user_id")
         kws = (
-            wrapper.keywords(text, top_k=top_k)
+            wrapper.keywords(text, top_k=top_k, cache_scope=scope)
             if hasattr(wrapper, "keywords")
-            else extract_keywords(text, top_k)
+            else extract_keywords(text, top_k, cache_scope=scope)
         )
         return jsonify({"keywords": kws})
     except Exception:
         return jsonify({"keywords": []})
 
 
+# Serve per-user data with an ETag so unchanged data is answered with 304
+def _conditional_json(user_id, load):
+    etag = conversation_version(user_id, conn=_db())
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(load(user_id, conn=_db()))
+    response.set_etag(etag)
+    response.vary.add("Cookie")
+    return response
+
+
 # Return per-user conversation history for frontend sidebar
 @csrf.exempt
 @app.route("/api/history")
@@ -396,8 +597,7 @@ def api_history():
         return jsonify([])
 
     try:
-        history = db_load_conversation(session["user_id"])
-        return jsonify(history)
+        return _conditional_json(session["user_id"], db_load_conversation)
     except Exception:
         logger.exception("Failed to load conversation history for user")
         return jsonify([])
@@ -409,7 +609,7 @@ def api_history():
 def api_sessions():
     if "user_id" not in session:
         return jsonify([])
-    return jsonify(list_sessions(session["user_id"]))
+    return _conditional_json(session["user_id"], list_sessions)
 
 
 # Load messages for a specific chat session
@@ -418,13 +618,13 @@ def api_sessions():
 def api_session(sid):
     if "user_id" not in session:
         return jsonify([])
-    return jsonify(load_session_messages(session["user_id"], sid))
+    return jsonify(load_session_messages(session["user_id"], sid, conn=_db()))
 
 
 # Accept and store uploaded files securely
 @csrf.exempt
-@limiter.limit("10 per minute")
 @app.route("/upload", methods=["POST"])
+@limiter.limit("10 per minute")
 def upload_file():
     if "file" not in request.files:
         return jsonify({"error": "No file uploaded."})
@@ -441,11 +641,23 @@ def upload_file():
     path = os.path.join(app.config["UPLOAD_FOLDER"], unique_name)
 
     try:
-        file.save(path)
+        try:
+            os.link(file.stream.name, path)
+            # The spool file is private (0600); give the upload the mode
+            # file.save would have, so a front-end server can send it
+            os.chmod(path, 0o666 & ~_UMASK)
+        except (AttributeError, OSError):
+            file.save(path)
         save_file_mapping(original_name, unique_name)
 
-        ext = original_name.rsplit(".", 1)[1].lower()
-        text_available = bool(_get_file_text(unique_name))
+        ext = _file_ext(original_name)
+        text_available = ext in TEXT_EXTENSIONS
+
+        # Warm the text cache off the request path so the upload returns at once
+        if text_available:
+            threading.Thread(
+                target=_get_file_text, args=(unique_name,), daemon=True
+            ).start()
 
         return jsonify(
             {
@@ -461,21 +673,67 @@ def upload_file():
         return jsonify({"error": str(e)}), 500
 
 
-# Extract text from uploaded files and cache results
+# How long extracted file text stays in Redis (seconds)
+FILE_TEXT_TTL = 3600
+
+
+# Read a cached text file; the mtime in the key invalidates rewritten caches.
+# The size is known up front, so read raw bytes and decode once instead of
+# going through a buffered text wrapper.
+@functools.lru_cache(maxsize=128)
+def _load_cached_text(cache_path, mtime):
+    fd = os.open(cache_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        while len(data) < size:
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(fd)
+    return data.decode("utf-8")
+
+
+# Share extracted text with other workers through Redis (best effort)
+def _remember_file_text(filename, text):
+    if redis_client is None:
+        return
+    try:
+        redis_client.setex(f"filetext:{filename}", FILE_TEXT_TTL, text)
+    except Exception:
+        logger.debug("Redis SETEX failed for %s", filename)
+
+
+# Extract text from uploaded files and cache results. The local text file
+# (memoized in memory) is checked before Redis, so a hot file costs no
+# network round trip; Redis is only written after a fresh extraction
 def _get_file_text(filename):
     cache_path = os.path.join(FILES_DIR, f"{filename}.txt")
-    if os.path.exists(cache_path):
+    try:
+        mtime = os.stat(cache_path).st_mtime
+    except OSError:
+        mtime = None
+    if mtime is not None:
         try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                return f.read()
+            return _load_cached_text(cache_path, mtime)
         except Exception:
             pass
 
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(f"filetext:{filename}")
+            if cached is not None:
+                return cached.decode("utf-8")
+        except Exception:
+            logger.debug("Redis GET failed for %s", filename)
+
     original_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
     if not os.path.exists(original_path):
         return ""
 
-    ext = filename.rsplit(".", 1)[1].lower()
+    ext = _file_ext(filename)
     try:
         if ext == "pdf":
             text = extract_text_from_pdf(original_path)
@@ -496,14 +754,15 @@ def _get_file_text(filename):
                 f.write(text)
         except Exception:
             pass
+        _remember_file_text(filename, text)
 
     return "" if text.startswith("(error)") else text
 
 
 # Generate explanation for uploaded documents
 @csrf.exempt
-@limiter.limit("10 per minute")
 @app.route("/explain_file", methods=["POST"])
+@limiter.limit("10 per minute")
 def explain_file():
     data = request.get_json() or {}
     filename = data.get("filename")
@@ -516,8 +775,23 @@ def explain_file():
     if not os.path.exists(path):
         return jsonify({"error": "file not found"})
 
+    # Read the session now; the streaming generator runs after the request
+    scope = session.get("user_id")
+
+    # Clients asking for an event stream get each partial as it completes
+    if request.accept_mimetypes.best == "text/event-stream":
+        def gen():
+            try:
+                for event in explain_pdf_stream(path=path, bullets=bullets, cache_scope=scope):
+                    yield _sse_event(app.json.dumps(event))
+            except Exception as e:
+                logger.exception("explain_file stream error: %s", e)
+                yield _sse_event(app.json.dumps({"error": str(e)}))
+
+        return Response(gen(), content_type="text/event-stream")
+
     try:
-        resp = explain_pdf(path=path, bullets=bullets)
+        resp = explain_pdf(path=path, bullets=bullets, cache_scope=scope)
         return jsonify(
             {
                 "ok": True,
@@ -530,9 +804,16 @@ def explain_file():
         return jsonify({"error": str(e)})
 
 
-# Serve uploaded files directly
+# Serve uploaded files directly, or hand the transfer off to nginx
 @app.route("/uploads/<path:filename>")
 def uploaded_file(filename):
+    if UPLOADS_ACCEL_PREFIX:
+        path = safe_join(app.config["UPLOAD_FOLDER"], filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        response = Response(mimetype=mimetypes.guess_type(filename)[0])
+        response.headers["X-Accel-Redirect"] = f"{UPLOADS_ACCEL_PREFIX}/{filename}"
+        return response
     return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
 
 
@@ -543,19 +824,22 @@ def favicon():
     )
 
 
-# Disable browser caching for static assets
+# Let browsers keep versioned static assets; always revalidate API data
 @app.after_request
-def add_no_cache_headers(response):
+def add_cache_headers(response):
     if request.path.startswith("/static/"):
-        response.headers["Cache-Control"] = "no-store, no-cache, max-age=0"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
+        if request.args.get("v"):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+    elif request.path.startswith("/api/"):
+        response.headers["Cache-Control"] = "no-cache"
     return response
 
 
-# Start Flask development server
+# Start Flask development server (use gunicorn.conf.py in production)
 if __name__ == "__main__":
     host = os.getenv("HOST", "127.0.0.1")
     port = int(os.getenv("PORT", 5000))
     logger.info("Starting app on %s:%d", host, port)
-    app.run(host=host, port=port)
+    app.run(host=host, port=port, threaded=True)
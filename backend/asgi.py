@@ -0,0 +1,15 @@
+# backend/asgi.py
+
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app as flask_app
+
+
+# Number of threads used to run blocking Flask handlers under the event loop
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "300"))
+
+
+# ASGI entry point: `uvicorn asgi:app --workers 4` (run from backend/)
+app = WSGIMiddleware(flask_app, workers=ASGI_THREADS)
@@ -1,60 +1,112 @@
+import os
+import time
 import uuid
 import bcrypt
-import re
-from datetime import datetime
+import string
 from typing import Optional, Tuple
-from database import get_db
+from database import connection
+
+try:
+    from argon2 import PasswordHasher
+    _ARGON2 = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+except ImportError:
+    _ARGON2 = None
+
+# Cost factor for bcrypt hashes (used when argon2 is not installed); read on
+# use, since app.py loads .env only after importing this module
+def _bcrypt_rounds() -> int:
+    return int(os.getenv("BCRYPT_ROUNDS") or "12")
 
 
 def hash_password(password: str) -> str:
+    if _ARGON2 is not None:
+        return _ARGON2.hash(password)
     return bcrypt.hashpw(
         password.encode("utf-8"),
-        bcrypt.gensalt()
+        bcrypt.gensalt(rounds=_bcrypt_rounds())
     ).decode("utf-8")
 
 
+def verify_password(password: str, stored: str) -> bool:
+    if stored.startswith("$argon2"):
+        if _ARGON2 is None:
+            return False
+        try:
+            return _ARGON2.verify(stored, password)
+        except Exception:
+            return False
+    return bcrypt.checkpw(password.encode("utf-8"), stored.encode("utf-8"))
+
+
+def needs_rehash(stored: str) -> bool:
+    # bcrypt hashes (and argon2 hashes with outdated parameters) are upgraded
+    # transparently after the next successful login
+    if _ARGON2 is None:
+        return False
+    if not stored.startswith("$argon2"):
+        return True
+    return _ARGON2.check_needs_rehash(stored)
+
+
+_UPPER = frozenset(string.ascii_uppercase)
+_LOWER = frozenset(string.ascii_lowercase)
+_SPECIAL = frozenset("@$!%*?&")
+
+
 def validate_password(password: str) -> Tuple[bool, str]:
     if len(password) < 8:
         return False, "Minimum 8 characters required"
-    if not re.search(r"[A-Z]", password):
+    # Classify each character once instead of running one regex per rule
+    has_upper = has_lower = has_digit = has_special = False
+    for ch in password:
+        if ch in _UPPER:
+            has_upper = True
+        elif ch in _LOWER:
+            has_lower = True
+        elif ch.isdecimal():
+            has_digit = True
+        elif ch in _SPECIAL:
+            has_special = True
+    if not has_upper:
         return False, "Add at least one uppercase letter"
-    if not re.search(r"[a-z]", password):
+    if not has_lower:
         return False, "Add at least one lowercase letter"
-    if not re.search(r"\d", password):
+    if not has_digit:
         return False, "Add at least one number"
-    if not re.search(r"[@$!%*?&]", password):
+    if not has_special:
         return False, "Add at least one special character"
     return True, ""
 
 
-def register_user(email: str, password: str) -> Optional[str]:
+def register_user(email: str, password: str, conn=None) -> Optional[str]:
     user_id = uuid.uuid4().hex
     try:
-        conn = get_db()
-        conn.execute(
-            "INSERT INTO users VALUES (?, ?, ?, ?)",
-            (user_id, email, hash_password(password), datetime.utcnow().isoformat())
-        )
-        conn.commit()
+        with connection(conn) as db:
+            db.execute(
+                "INSERT INTO users VALUES (?, ?, ?, ?)",
+                (user_id, email, hash_password(password), int(time.time() * 1000))
+            )
+            db.commit()
         return user_id
     except Exception:
         return None
-    finally:
-        conn.close()
 
 
-def authenticate_user(email: str, password: str) -> Optional[str]:
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id, password FROM users WHERE email=?", (email,))
-    row = cur.fetchone()
-    conn.close()
+def authenticate_user(email: str, password: str, conn=None) -> Optional[str]:
+    with connection(conn) as db:
+        row = db.execute(
+            "SELECT id, password FROM users WHERE email=?", (email,)
+        ).fetchone()
 
-    if not row:
-        return None
-    if not bcrypt.checkpw(
-        password.encode("utf-8"),
-        row["password"].encode("utf-8")
-    ):
-        return None
+        if not row:
+            return None
+        if not verify_password(password, row["password"]):
+            return None
+
+        if needs_rehash(row["password"]):
+            db.execute(
+                "UPDATE users SET password=? WHERE id=?",
+                (hash_password(password), row["id"])
+            )
+            db.commit()
     return row["id"]
@@ -1,62 +1,85 @@
-from datetime import datetime
+import time
 import uuid
-from database import get_db
-
-
-def save_message(user_id: str, role: str, content: str, session_id: str):
-    conn = get_db()
-    conn.execute(
-        "INSERT INTO conversations (user_id, role, content, created_at, session_id) VALUES (?, ?, ?, ?, ?)",
-        (user_id, role, content, datetime.utcnow().isoformat(), session_id)
-    )
-    conn.commit()
-    conn.close()
-
-
-def load_conversation(user_id: str):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT role, content FROM conversations WHERE user_id=? ORDER BY id",
-        (user_id,)
-    )
-    rows = cur.fetchall()
-    conn.close()
-    return [{"role": r["role"], "content": r["content"]} for r in rows]
+from typing import Dict, Iterator, List, Optional, Tuple
+from database import connection
+
+
+def save_message(user_id: str, role: str, content: str, session_id: str, conn=None):
+    with connection(conn) as db:
+        db.execute(
+            "INSERT INTO conversations (user_id, role, content, created_at, session_id) VALUES (?, ?, ?, ?, ?)",
+            (user_id, role, content, int(time.time() * 1000), session_id)
+        )
+        db.commit()
+
+
+def save_messages(user_id: str, session_id: str, messages: List[Tuple[str, str]], conn=None):
+    created_at = int(time.time() * 1000)
+    rows = [(user_id, role, content, created_at, session_id) for role, content in messages]
+    with connection(conn) as db:
+        db.executemany(
+            "INSERT INTO conversations (user_id, role, content, created_at, session_id) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        db.commit()
+
+
+def load_conversation_iter(user_id: str, conn=None) -> Iterator[Dict[str, str]]:
+    with connection(conn) as db:
+        cur = db.execute(
+            "SELECT role, content FROM conversations WHERE user_id=? ORDER BY id",
+            (user_id,)
+        )
+        for r in cur:
+            yield {"role": r["role"], "content": r["content"]}
+
+
+def load_conversation(user_id: str, conn=None):
+    return list(load_conversation_iter(user_id, conn=conn))
+
+
+def conversation_version(user_id: str, conn=None) -> str:
+    with connection(conn) as db:
+        last_id, n_sessions = db.execute(
+            "SELECT (SELECT MAX(id) FROM conversations WHERE user_id=?), "
+            "(SELECT COUNT(*) FROM chat_sessions WHERE user_id=?)",
+            (user_id, user_id)
+        ).fetchone()
+    return f"{user_id}-{last_id or 0}-{n_sessions}"
 
 
-def create_session(user_id: str, title: str) -> str:
+def create_session(user_id: str, title: str, conn=None) -> str:
     session_id = uuid.uuid4().hex
-    conn = get_db()
-    conn.execute(
-        "INSERT INTO chat_sessions VALUES (?, ?, ?, ?)",
-
-        (session_id, user_id, title, datetime.utcnow().isoformat())
-    )
-    conn.commit()
-    conn.close()
+    with connection(conn) as db:
+        db.execute(
+            "INSERT INTO chat_sessions VALUES (?, ?, ?, ?)",
+            (session_id, user_id, title, int(time.time() * 1000))
+        )
+        db.commit()
     return session_id
 
 
-def list_sessions(user_id: str):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT id, title FROM chat_sessions WHERE user_id=? ORDER BY created_at DESC",
-        (user_id,)
-    )
-    rows = cur.fetchall()
-    conn.close()
+def list_sessions(user_id: str, conn=None):
+    with connection(conn) as db:
+        rows = db.execute(
+            "SELECT id, title FROM chat_sessions WHERE user_id=? ORDER BY created_at DESC",
+            (user_id,)
+        ).fetchall()
     return [{"id": r["id"], "title": r["title"]} for r in rows]
 
 
-def load_session_messages(user_id: str, session_id: str):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT role, content FROM conversations WHERE user_id=? AND session_id=? ORDER BY id",
-        (user_id, session_id)
-    )
-    rows = cur.fetchall()
-    conn.close()
+def load_session_messages(user_id: str, session_id: str, conn=None, limit: Optional[int] = None):
+    with connection(conn) as db:
+        if limit:
+            # Newest rows first via the index, then back into chronological order
+            rows = db.execute(
+                "SELECT role, content FROM conversations WHERE user_id=? AND session_id=? ORDER BY id DESC LIMIT ?",
+                (user_id, session_id, limit)
+            ).fetchall()
+            rows.reverse()
+        else:
+            rows = db.execute(
+                "SELECT role, content FROM conversations WHERE user_id=? AND session_id=? ORDER BY id",
+                (user_id, session_id)
+            ).fetchall()
     return [{"role": r["role"], "content": r["content"]} for r in rows]
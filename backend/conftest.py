@@ -0,0 +1,47 @@
+# backend/conftest.py
+
+import os
+import re
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before anything imports it
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="worison-test-"), "app.db")
+
+from app import app  # noqa: E402
+
+
+_CSRF_RE = re.compile(r'name="csrf_token"\s+value="([^"]+)"')
+
+
+def _extract_csrf(html_text: str) -> str:
+    m = _CSRF_RE.search(html_text)
+    return m.group(1) if m else ""
+
+
+# One logged-in test client shared by every test in the session, so the
+# signup/login round trip (and its bcrypt hash) happens once
+@pytest.fixture(scope="session")
+def client():
+    client = app.test_client()
+    email = "test@example.com"
+    password = "Test123!"
+
+    r = client.get("/signup")
+    resp = client.post(
+        "/signup",
+        data={"email": email, "password": password, "csrf_token": _extract_csrf(r.get_data(as_text=True))},
+        follow_redirects=True,
+    )
+
+    # If signup failed (user exists), log in instead
+    if resp.status_code != 200:
+        r = client.get("/login")
+        resp = client.post(
+            "/login",
+            data={"email": email, "password": password, "csrf_token": _extract_csrf(r.get_data(as_text=True))},
+            follow_redirects=True,
+        )
+    assert resp.status_code == 200
+    return client
@@ -1,31 +1,122 @@
 import sqlite3
 import os
-import shutil
+import json
+import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
-DB_PATH = os.path.join(PROJECT_ROOT, "backend", "app.db")
+# DB_PATH can point elsewhere (tests use a throwaway file); read at import
+DB_PATH = os.getenv("DB_PATH") or os.path.join(PROJECT_ROOT, "backend", "app.db")
 BACKUP_DIR = os.path.join(PROJECT_ROOT, "backups")
 
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+# Per-connection settings; journal_mode=WAL is persistent and set in init_db
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+
+# One long-lived connection per thread, opened on first use
+_local = threading.local()
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_db():
+    # Returns this thread's shared connection; callers must not close it
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
     return conn
 
 
+@contextmanager
+def connection(conn=None):
+    # Use the caller's connection when given, otherwise this thread's one;
+    # roll back on error so no half-done transaction outlives the block
+    db = conn if conn is not None else get_db()
+    try:
+        yield db
+    except Exception:
+        if conn is None:
+            db.rollback()
+        raise
+
+
+# Legacy created_at values were ISO-8601 strings (or epoch seconds for some
+# chat_sessions rows); convert either form to epoch milliseconds
+_EPOCH_MS_SQL = (
+    "CASE WHEN instr(created_at, '-') = 0 THEN CAST(created_at AS INTEGER) * 1000 "
+    "ELSE CAST(round((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER) END"
+)
+
+
+# Rebuild a table whose created_at column is still TEXT so it stores integers;
+# a type change needs a copy because SQLite cannot alter a column in place.
+# Several workers may start at once: the write lock is taken before the schema
+# is read, so a worker that waited finds the table already migrated instead of
+# converting its millisecond values a second time
+def _migrate_created_at(conn, table):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)
+        ).fetchone()
+        if not row or not re.search(r"created_at\s+TEXT", row["sql"]):
+            conn.rollback()
+            return
+
+        cols = [c["name"] for c in conn.execute(f"PRAGMA table_info({table})")]
+        create = re.sub(r"created_at\s+TEXT", "created_at INTEGER", row["sql"], count=1)
+        create = re.sub(rf"^CREATE TABLE\s+(IF NOT EXISTS\s+)?\"?{table}\"?", f"CREATE TABLE {table}_new", create)
+        select = ", ".join(_EPOCH_MS_SQL if c == "created_at" else c for c in cols)
+
+        # Keep the AUTOINCREMENT high-water mark so deleted ids are not reused
+        seq = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name=?", (table,)
+        ).fetchone() if "AUTOINCREMENT" in row["sql"].upper() else None
+
+        conn.execute(f"DROP TABLE IF EXISTS {table}_new")
+        conn.execute(create)
+        conn.execute(f"INSERT INTO {table}_new ({', '.join(cols)}) SELECT {select} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+        if seq is not None:
+            conn.execute(
+                "UPDATE sqlite_sequence SET seq=MAX(seq, ?) WHERE name=?", (seq["seq"], table)
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
 def init_db():
     conn = get_db()
     cur = conn.cursor()
 
+    # WAL lets readers proceed while a chat turn is being written
+    cur.execute("PRAGMA journal_mode=WAL")
+
     cur.execute("""
     CREATE TABLE IF NOT EXISTS users (
         id TEXT PRIMARY KEY,
         email TEXT UNIQUE NOT NULL,
         password TEXT NOT NULL,
-        created_at TEXT NOT NULL
+        created_at INTEGER NOT NULL
     )
     """)
 
@@ -35,7 +126,7 @@ def init_db():
         user_id TEXT NOT NULL,
         role TEXT NOT NULL,
         content TEXT NOT NULL,
-        created_at TEXT NOT NULL
+        created_at INTEGER NOT NULL
     )
     """)
 
@@ -45,7 +136,34 @@ def init_db():
             id TEXT PRIMARY KEY,
             user_id TEXT NOT NULL,
             title TEXT NOT NULL,
-            created_at TEXT NOT NULL
+            created_at INTEGER NOT NULL
+        )
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS file_map (
+            original TEXT PRIMARY KEY,
+            unique_name TEXT NOT NULL,
+            ts REAL NOT NULL
+        )
+        """
+    )
+
+    # Cached model responses are disposable; a table from before the
+    # semantic-lookup columns were removed is simply recreated
+    cache_cols = [row["name"] for row in cur.execute("PRAGMA table_info(model_cache)")]
+    if "embedding" in cache_cols:
+        cur.execute("DROP TABLE model_cache")
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS model_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            ttl REAL NOT NULL
         )
         """
     )
@@ -56,13 +174,82 @@ def init_db():
     cols = [row["name"] for row in cur.fetchall()]
     if "session_id" not in cols:
         cur.execute("ALTER TABLE conversations ADD COLUMN session_id TEXT")
+    conn.commit()
+
+    # created_at holds integer epoch milliseconds
+    for table in ("users", "conversations", "chat_sessions"):
+        _migrate_created_at(conn, table)
+
+    # Indexes matching the history/session queries in chat_store, so they
+    # are served as index range scans without a sort step
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_conv_user_session_id "
+        "ON conversations(user_id, session_id, id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_conv_user_id "
+        "ON conversations(user_id, id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user_created "
+        "ON chat_sessions(user_id, created_at DESC)"
+    )
+
+    # Expiry deletes model_cache rows by deadline
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_model_cache_expires ON model_cache(created_at + ttl)"
+    )
 
     conn.commit()
-    conn.close()
+
+
+# Legacy timestamps were epoch seconds; an unreadable one becomes 0
+def _timestamp_or_zero(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# One-time import of the file_map.json that older versions kept in the
+# storage dir; rows already in the table win, and the JSON file is renamed
+# afterwards so it is not read again
+def import_file_map_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+    except (OSError, ValueError):
+        return
+    # Anything but an object of entries is not a file map; leave it alone
+    if not isinstance(mapping, dict):
+        return
+
+    rows = [
+        (original, entry["unique_name"], _timestamp_or_zero(entry.get("timestamp")))
+        for original, entry in mapping.items()
+        if isinstance(entry, dict) and isinstance(entry.get("unique_name"), str)
+        and entry["unique_name"]
+    ]
+    conn = get_db()
+    conn.executemany(
+        "INSERT OR IGNORE INTO file_map (original, unique_name, ts) VALUES (?, ?, ?)",
+        rows
+    )
+    conn.commit()
+
+    try:
+        os.replace(path, path + ".imported")
+    except OSError:
+        pass
 
 
 def backup_database():
     if not os.path.exists(DB_PATH):
         return
     ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    shutil.copy(DB_PATH, os.path.join(BACKUP_DIR, f"backup_{ts}.db"))
+    # Use the backup API: a plain file copy would miss pages still in the WAL
+    dst = sqlite3.connect(os.path.join(BACKUP_DIR, f"backup_{ts}.db"))
+    try:
+        get_db().backup(dst)
+    finally:
+        dst.close()
@@ -2,9 +2,9 @@
 
 from typing import List, Optional, Dict
 import logging
+import functools
 
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
 
 from model_wrapper import get_wrapper
 
@@ -14,13 +14,30 @@ logger = logging.getLogger("embedding")
 logger.setLevel(logging.INFO)
 
 
+# Attempt to import FAISS for BLAS-backed inner-product search
+try:
+    import faiss
+except Exception:
+    faiss = None
+    logger.info("faiss not available – using NumPy brute-force search")
+
+
+# Scale rows to unit length (zero rows stay zero)
+def _normalize(arr: np.ndarray) -> np.ndarray:
+    arr = np.ascontiguousarray(arr, dtype=np.float32)
+    arr /= np.linalg.norm(arr, axis=1, keepdims=True) + 1e-12
+    return arr
+
+
 # In-memory embedding index supporting similarity search
 class EmbeddingIndex:
-    # Initialize storage for IDs, vectors, nearest-neighbor model, and model wrapper
+    # Initialize storage for IDs, vectors, search structures, and model wrapper
     def __init__(self):
         self.ids: List[str] = []
         self.vectors: Optional[np.ndarray] = None
-        self.nn: Optional[NearestNeighbors] = None
+        self._buf: Optional[np.ndarray] = None
+        self._n = 0
+        self.index = None
         self.wrapper = get_wrapper()
 
     # Add a list of texts and optional IDs into the embedding index
@@ -33,46 +50,57 @@ class EmbeddingIndex:
             logger.warning("Embeddings not available. Skipping index add.")
             return
 
-        arr = np.array(embeddings, dtype=float)
-
-        if self.vectors is None:
-            self.vectors = arr
-            self.ids = ids or [str(i) for i in range(len(arr))]
-        else:
-            start = len(self.ids)
-            self.vectors = np.vstack([self.vectors, arr])
-            new_ids = ids or [str(start + i) for i in range(len(arr))]
-            self.ids.extend(new_ids)
+        # Store unit-length rows: cosine similarity becomes a plain dot product
+        arr = _normalize(np.asarray(embeddings, dtype=np.float32))
 
-        self._rebuild_index()
+        start = len(self.ids)
+        self.ids.extend(ids or [str(start + i) for i in range(len(arr))])
 
-    # Create or refresh the nearest-neighbor search structure
-    def _rebuild_index(self) -> None:
-        if self.vectors is None or len(self.vectors) == 0:
-            self.nn = None
+        # FAISS: adding rows extends the flat index in place, no rebuild needed
+        if faiss is not None:
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(arr.shape[1])
+            self.index.add(arr)
             return
 
-        n_neighbors = min(10, len(self.vectors))
-        self.nn = NearestNeighbors(
-            n_neighbors=n_neighbors,
-            metric="cosine",
-        )
-        self.nn.fit(self.vectors)
+        self._append_vectors(arr)
+
+    # Append rows into a preallocated buffer, doubling capacity when full
+    def _append_vectors(self, arr: np.ndarray) -> None:
+        needed = self._n + len(arr)
+        if self._buf is None or needed > len(self._buf):
+            capacity = max(needed, 2 * (len(self._buf) if self._buf is not None else 0), 64)
+            buf = np.empty((capacity, arr.shape[1]), dtype=np.float32)
+            if self._n:
+                np.copyto(buf[:self._n], self._buf[:self._n])
+            self._buf = buf
+
+        np.copyto(self._buf[self._n:needed], arr)
+        self._n = needed
+        self.vectors = self._buf[:self._n]
 
     # Query the index using a text input and return similarity results
     def query(self, text: str, top_k: int = 5) -> List[Dict[str, float]]:
-        if not text or not self.nn:
+        if not text or (self.index is None and self._n == 0):
             return []
 
         embeddings = self.wrapper.generate_embeddings([text])
         if not embeddings:
             return []
 
-        arr = np.array(embeddings, dtype=float)
+        q = _normalize(np.asarray(embeddings, dtype=np.float32))
 
         try:
-            k = min(top_k, len(self.vectors))
-            distances, indices = self.nn.kneighbors(arr, n_neighbors=k)
+            k = min(top_k, len(self.ids))
+            if self.index is not None:
+                sims, indices = self.index.search(q, k)
+            else:
+                # One BLAS matrix-vector product, then sort only the top k
+                scores = self.vectors @ q[0]
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+                sims, indices = scores[top][None, :], top[None, :]
+            distances = 1.0 - sims
 
             results = []
             for rank, idx in enumerate(indices[0]):
@@ -88,13 +116,7 @@ class EmbeddingIndex:
             return []
 
 
-# Global singleton instance for shared embedding index usage
-_GLOBAL_INDEX: Optional[EmbeddingIndex] = None
-
-
-# Retrieve or create the global embedding index instance
+# Retrieve or create the shared embedding index instance
+@functools.lru_cache(maxsize=1)
 def get_embedding_index() -> EmbeddingIndex:
-    global _GLOBAL_INDEX
-    if _GLOBAL_INDEX is None:
-        _GLOBAL_INDEX = EmbeddingIndex()
-    return _GLOBAL_INDEX
+    return EmbeddingIndex()
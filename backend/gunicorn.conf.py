@@ -0,0 +1,24 @@
+# backend/gunicorn.conf.py
+#
+# Production server settings: `gunicorn -c gunicorn.conf.py app:app` (from backend/)
+
+import multiprocessing
+import os
+
+
+# Bind address follows the same HOST/PORT variables as the dev server
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+
+# One threaded worker per core. Real OS threads (not gevent greenlets) keep
+# database.py's per-thread SQLite connections long-lived, and CPU-bound OCR
+# or PDF work in one request cannot stall every other request in the worker
+workers = int(os.getenv("WEB_CONCURRENCY") or multiprocessing.cpu_count())
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS") or "32")
+
+# Export the worker count so ocr.py can size each worker's OCR process pool
+# to its share of the cores (cores // workers) instead of every core
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Model calls and OCR can run long; don't kill busy workers too early
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
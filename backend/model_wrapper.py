@@ -2,11 +2,18 @@
 
 import os
 import json
+import time
+import hashlib
 import logging
-from typing import List, Optional, Any
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Any, Iterator
 
+import numpy as np
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 
+from database import connection
+
 
 # Configure logger for model wrapper operations
 logger = logging.getLogger("model_wrapper")
@@ -33,14 +40,27 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "").strip()
 MODEL_NAME = os.getenv("MODEL_NAME", "models/gemini-2.0-flash-lite").strip()
 
 
+# Response cache: entries expire after MODEL_CACHE_TTL seconds
+CACHE_TTL = float(os.getenv("MODEL_CACHE_TTL", "86400"))
+
+
+# Maximum number of chunk prompts sent to the model at the same time
+GENERATE_CONCURRENCY = int(os.getenv("GENERATE_CONCURRENCY", "8"))
+
+
+# Number of most recent messages included in a chat prompt
+CHAT_HISTORY_TURNS = 8
+
+
 # Internal reference to the initialized model instance
 _MODEL: Optional[Any] = None
 
 
-# Initialize the Generative AI model if possible
+# Initialize the Generative AI model if possible (no-op once initialized)
 def _init_model():
     global _MODEL
-    _MODEL = None
+    if _MODEL is not None:
+        return
 
     if not GENAI_AVAILABLE:
         logger.warning("GenAI SDK missing – model disabled")
@@ -120,10 +140,9 @@ def _chunk_text(text: str, max_chars: int = 3800) -> List[str]:
     while start < len(text):
         end = min(start + max_chars, len(text))
         if end < len(text):
-            slice_ = text[start:end]
-            cut = max(slice_.rfind("\n"), slice_.rfind(". "))
-            if cut > max_chars * 0.5:
-                end = start + cut + 1
+            cut = max(text.rfind("\n", start, end), text.rfind(". ", start, end))
+            if cut - start > max_chars * 0.5:
+                end = cut + 1
         chunks.append(text[start:end].strip())
         start = end
     return chunks
@@ -155,20 +174,161 @@ def _call_model(prompt, gen_cfg):
     return _MODEL.generate_content(prompt)
 
 
-# Generate text output from the model with safety checks
-def _generate(prompt, max_tokens=512, temperature=0.18, top_p=0.9) -> str:
+# Optional in-process embedding model (sentence-transformers), used instead
+# of the remote API when LOCAL_EMBED_MODEL names one, e.g. BAAI/bge-small-en-v1.5
+LOCAL_EMBED_MODEL = os.getenv("LOCAL_EMBED_MODEL", "").strip()
+
+
+# Load the local embedding model once (None when unavailable)
+@functools.lru_cache(maxsize=1)
+def _local_embedder():
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(LOCAL_EMBED_MODEL)
+        logger.info("Loaded local embedding model: %s", LOCAL_EMBED_MODEL)
+        return model
+    except Exception as e:
+        logger.warning("Local embedding model %s not available: %s", LOCAL_EMBED_MODEL, e)
+        return None
+
+
+# Generate embeddings locally or with the GenAI SDK (empty list when unsupported)
+def _embed(texts: List[str]) -> List[List[float]]:
+    if not texts:
+        return []
+
+    if LOCAL_EMBED_MODEL:
+        model = _local_embedder()
+        if model is not None:
+            try:
+                vecs = model.encode(
+                    texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+                )
+                return vecs.astype(np.float32).tolist()
+            except Exception as e:
+                logger.warning("Local embedding failed: %s", e)
+
+    if _MODEL is None:
+        return []
+
+    try:
+        if hasattr(genai, "embeddings") and hasattr(genai.embeddings, "create"):
+            resp = genai.embeddings.create(
+                model=getattr(genai, "EMBEDDING_MODEL", "text-embedding-3-large"),
+                input=texts,
+            )
+            data = getattr(resp, "data", None) or resp.get("data", [])
+            return [list(item["embedding"]) for item in data if "embedding" in item]
+    except Exception:
+        logger.warning("Embedding generation failed")
+
+    return []
+
+
+# Hash a prompt together with the settings that shape its output
+def _cache_key(prompt: str, params: str) -> str:
+    return hashlib.sha256(f"{params}\n{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+# Return an unexpired cached response stored under the exact key
+def _cache_get(key: str) -> Optional[str]:
+    try:
+        with connection() as db:
+            row = db.execute(
+                "SELECT response FROM model_cache WHERE key=? AND created_at + ttl > ?",
+                (key, time.time())
+            ).fetchone()
+        return row["response"] if row else None
+    except Exception as e:
+        logger.debug("Model cache lookup failed: %s", e)
+        return None
+
+
+# Store a model response under its key, dropping expired entries so the
+# table does not grow without bound
+def _cache_put(key: str, response: str) -> None:
+    try:
+        with connection() as db:
+            db.execute("DELETE FROM model_cache WHERE created_at + ttl <= ?", (time.time(),))
+            db.execute(
+                "INSERT OR REPLACE INTO model_cache (key, response, created_at, ttl) "
+                "VALUES (?, ?, ?, ?)",
+                (key, response, time.time(), CACHE_TTL)
+            )
+            db.commit()
+    except Exception as e:
+        logger.debug("Model cache store failed: %s", e)
+
+
+# Generate text output from the model with safety checks. Responses are
+# cached per cache_scope (the user id), and not at all when it is None, so
+# one user's document never answers another user's prompt
+def _generate(
+    prompt,
+    max_tokens=512,
+    temperature=0.18,
+    top_p=0.9,
+    cache_scope=None,
+) -> str:
     if _MODEL is None:
         return "(fallback) Model not configured."
 
+    params = f"{cache_scope}|{MODEL_NAME}|{max_tokens}|{temperature}|{top_p}"
+    key = None
+    if cache_scope is not None:
+        key = _cache_key(prompt, params)
+        cached = _cache_get(key)
+        if cached is not None:
+            return cached
+
     try:
         cfg = _gen_config(max_tokens, temperature, top_p)
         resp = _call_model(prompt, cfg)
         text = _extract_text(resp)
-        return text or "(info) Empty model response."
     except Exception as e:
         logger.exception("Model call failed: %s", e)
         return f"(error) {e}"
 
+    if not text:
+        return "(info) Empty model response."
+    if key is not None:
+        _cache_put(key, text)
+    return text
+
+
+# Generate responses for independent prompts concurrently, preserving order.
+# The SDK call is network-bound, so threads overlap the round trips.
+def _generate_all(prompts: List[str], **kwargs) -> List[str]:
+    if len(prompts) <= 1:
+        return [_generate(p, **kwargs) for p in prompts]
+
+    with ThreadPoolExecutor(max_workers=min(GENERATE_CONCURRENCY, len(prompts))) as ex:
+        return list(ex.map(lambda p: _generate(p, **kwargs), prompts))
+
+
+# Stream text fragments from the model as they are generated
+def _generate_stream(prompt, max_tokens=512, temperature=0.18, top_p=0.9):
+    if _MODEL is None:
+        yield "(fallback) Model not configured."
+        return
+
+    try:
+        cfg = _gen_config(max_tokens, temperature, top_p)
+        if cfg is not None:
+            resp = _MODEL.generate_content(prompt, generation_config=cfg, stream=True)
+        else:
+            resp = _MODEL.generate_content(prompt, stream=True)
+        for chunk in resp:
+            try:
+                text = chunk.text
+            except Exception:
+                text = _extract_text(chunk)
+            if text:
+                yield text
+    except Exception as e:
+        logger.exception("Streaming model call failed: %s", e)
+        yield f"(error) {e}"
+
 
 # Public-facing wrapper exposing AI capabilities
 class ModelWrapper:
@@ -176,11 +336,8 @@ class ModelWrapper:
         self.available = _MODEL is not None
         logger.info("ModelWrapper available=%s", self.available)
 
-    # Generate a conversational response using recent history
-    def chat_response(self, user_message: str, history: Optional[List[dict]] = None) -> str:
-        if not self.available:
-            return "(fallback) Model not available."
-
+    # Build the chat prompt from the system message and recent history
+    def _chat_prompt(self, user_message: str, history: Optional[List[dict]] = None) -> str:
         history = history or []
         system = (
             "You are WORISON — Wisdom-Oriented Responsive Intelligent Support & Operations Network. "
@@ -188,7 +345,7 @@ class ModelWrapper:
         )
 
         lines = [f"System: {system}"]
-        for turn in history[-8:]:
+        for turn in history[-CHAT_HISTORY_TURNS:]:
             role = turn.get("role")
             content = turn.get("content") or turn.get("text") or ""
             if not content:
@@ -197,30 +354,47 @@ class ModelWrapper:
             lines.append(f"{label}: {content}")
         lines.append(f"User: {user_message}")
         lines.append("Assistant:")
+        return "\n".join(lines)
 
-        return _generate("\n".join(lines), max_tokens=600)
+    # Generate a conversational response using recent history
+    def chat_response(self, user_message: str, history: Optional[List[dict]] = None) -> str:
+        if not self.available:
+            return "(fallback) Model not available."
+        # Conversations are personal and rarely repeat, so they are not cached
+        return _generate(self._chat_prompt(user_message, history), max_tokens=600)
 
-    # Summarize long text into concise bullet points
-    def summarize(self, text: str, bullets: int = 3) -> str:
+    # Stream a conversational response fragment by fragment
+    def chat_response_stream(
+        self, user_message: str, history: Optional[List[dict]] = None
+    ) -> Iterator[str]:
+        if not self.available:
+            yield "(fallback) Model not available."
+            return
+        yield from _generate_stream(self._chat_prompt(user_message, history), max_tokens=600)
+
+    # Summarize long text into concise bullet points; responses are cached
+    # under cache_scope (the user id) when one is given
+    def summarize(self, text: str, bullets: int = 3, cache_scope: Optional[str] = None) -> str:
         if not self.available:
             return "(fallback) Model not available."
         if not text.strip():
             return "(info) No text provided."
 
         parts = _chunk_text(text)
-        partials = []
-        for i, p in enumerate(parts, 1):
-            prompt = f"Summarize part {i}/{len(parts)} into {bullets} bullet points:\n\n{p}"
-            partials.append(_generate(prompt, max_tokens=220, temperature=0.12))
+        prompts = [
+            f"Summarize part {i}/{len(parts)} into {bullets} bullet points:\n\n{p}"
+            for i, p in enumerate(parts, 1)
+        ]
+        partials = _generate_all(prompts, max_tokens=220, temperature=0.12, cache_scope=cache_scope)
 
         synth = (
             "Combine the partial summaries into a final concise summary with "
             f"{bullets} numbered bullet points:\n\n" + "\n\n".join(partials)
         )
-        return _generate(synth, max_tokens=300, temperature=0.12)
+        return _generate(synth, max_tokens=300, temperature=0.12, cache_scope=cache_scope)
 
     # Extract important keywords from text
-    def keywords(self, text: str, top_k: int = 8) -> List[str]:
+    def keywords(self, text: str, top_k: int = 8, cache_scope: Optional[str] = None) -> List[str]:
         if not self.available:
             return []
 
@@ -228,7 +402,7 @@ class ModelWrapper:
             f"Extract the top {top_k} keywords. "
             "Return ONLY a JSON array of strings.\n\n" + text
         )
-        raw = _generate(prompt, max_tokens=150, temperature=0.0)
+        raw = _generate(prompt, max_tokens=150, temperature=0.0, cache_scope=cache_scope)
 
         try:
             arr = json.loads(raw)
@@ -248,37 +422,24 @@ class ModelWrapper:
 
     # Generate vector embeddings for semantic search
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        if not self.available or not texts:
+        if not texts:
             return []
-
-        try:
-            if hasattr(genai, "embeddings") and hasattr(genai.embeddings, "create"):
-                resp = genai.embeddings.create(
-                    model=getattr(genai, "EMBEDDING_MODEL", "text-embedding-3-large"),
-                    input=texts,
-                )
-                data = getattr(resp, "data", None) or resp.get("data", [])
-                return [list(item["embedding"]) for item in data if "embedding" in item]
-        except Exception:
-            logger.warning("Embedding generation failed")
-
-        return []
+        return _embed(texts)
 
     # Explain extracted PDF text in plain language
-    def explain_pdf_text(self, text: str, bullets: int = 4) -> str:
+    def explain_pdf_text(self, text: str, bullets: int = 4, cache_scope: Optional[str] = None) -> str:
         if not self.available:
             return "(fallback) Model not available."
         if not text.strip():
             return "(info) No text to explain."
 
         parts = _chunk_text(text)
-        partials = []
-        for i, p in enumerate(parts, 1):
-            prompt = (
-                f"Part {i}/{len(parts)}: Explain in plain language "
-                "and list 2 takeaways:\n\n" + p
-            )
-            partials.append(_generate(prompt, max_tokens=300, temperature=0.12))
+        prompts = [
+            f"Part {i}/{len(parts)}: Explain in plain language "
+            "and list 2 takeaways:\n\n" + p
+            for i, p in enumerate(parts, 1)
+        ]
+        partials = _generate_all(prompts, max_tokens=300, temperature=0.12, cache_scope=cache_scope)
 
         synth = (
             "Using the partial explanations, provide:\n"
@@ -286,10 +447,10 @@ class ModelWrapper:
             f"2) {bullets} numbered key takeaways\n\n"
             + "\n\n".join(partials)
         )
-        return _generate(synth, max_tokens=450, temperature=0.12)
+        return _generate(synth, max_tokens=450, temperature=0.12, cache_scope=cache_scope)
 
     # Generate a textual description for an image
-    def describe_image(self, image_path: str) -> str:
+    def describe_image(self, image_path: str, cache_scope: Optional[str] = None) -> str:
         if not self.available:
             return "(fallback) Model not available."
 
@@ -302,21 +463,15 @@ class ModelWrapper:
         except Exception:
             pass
 
-        return _generate(f"Describe the image at path: {image_path}", max_tokens=300)
-
-
-# Singleton instance for shared model access
-_WRAPPER: Optional[ModelWrapper] = None
+        return _generate(
+            f"Describe the image at path: {image_path}", max_tokens=300, cache_scope=cache_scope
+        )
 
 
-# Retrieve or create the model wrapper instance
+# Retrieve or create the shared model wrapper instance; this is the entry
+# point and initializes the model on first use
+@functools.lru_cache(maxsize=1)
 def get_wrapper() -> ModelWrapper:
-    global _WRAPPER
-    if _WRAPPER is None:
-        _init_model()
-        _WRAPPER = ModelWrapper()
-    return _WRAPPER
-
+    _init_model()
+    return ModelWrapper()
 
-# Perform eager initialization to surface startup issues in logs
-_init_model()
@@ -1,11 +1,28 @@
 # backend/ocr.py
 
 import os
+import time
+import queue
 import logging
-from typing import Optional
-
-from PIL import Image, ImageFilter, ImageOps
-import pytesseract
+import hashlib
+import tempfile
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+# Keep Tesseract (OpenMP) and NumPy's BLAS single-threaded. Parallelism
+# comes from OCR'ing pages in separate processes and from concurrent
+# requests; letting each page also start its own thread team oversubscribes
+# the CPU and is slower overall. The trade-off is that a single page on an
+# otherwise idle machine no longer uses several cores. Either variable can
+# still be overridden from the environment.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+
+import numpy as np  # noqa: E402
+from PIL import Image, ImageFilter, ImageOps  # noqa: E402
+import pytesseract  # noqa: E402
 
 
 # Configure logger for OCR-related operations
@@ -15,11 +32,44 @@ logger.setLevel(logging.INFO)
 
 # Attempt to import pdf2image utilities safely
 try:
-    from pdf2image import convert_from_path, convert_from_bytes
+    from pdf2image import convert_from_path, pdfinfo_from_path
 except Exception:
     convert_from_path = None
-    convert_from_bytes = None
-    logger.warning("pdf2image not available – PDF OCR disabled")
+    pdfinfo_from_path = None
+    logger.warning("pdf2image not available")
+
+
+# Prefer rendering PDFs in-process with PDFium over spawning Poppler
+try:
+    import pypdfium2 as pdfium
+except Exception:
+    pdfium = None
+    logger.warning("pypdfium2 not available – rendering PDFs with Poppler")
+
+
+# Optional SIMD image ops for preprocessing
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+
+# Optional JIT compiler for the preprocessing kernel. Only needed without
+# OpenCV, so it is not even imported (let alone compiled) when cv2 is present
+numba = None
+if cv2 is None:
+    try:
+        import numba
+    except Exception:
+        numba = None
+
+
+# Prefer in-process libtesseract; pytesseract spawns a process per image
+try:
+    import tesserocr
+except Exception:
+    tesserocr = None
+    logger.warning("tesserocr not available – falling back to pytesseract")
 
 
 # Ensure Poppler binaries are available on PATH (Windows only)
@@ -66,13 +116,232 @@ def _ensure_tesseract_on_path():
 _ensure_tesseract_on_path()
 
 
+# Tesseract options in command-line form, e.g. "-l eng --oem 1 --psm 6";
+# --oem 1 selects the LSTM engine, which is fastest with tessdata_fast models
+# (point TESSDATA_PREFIX at them)
+TESSERACT_CONFIG = (os.getenv("TESSERACT_CONFIG") or "--oem 1").strip()
+
+
+# Translate the -l/--oem/--psm options of TESSERACT_CONFIG for tesserocr
+def _tesserocr_options(config: str) -> dict:
+    args = config.split()
+    options = {}
+    for flag, key, convert in (("-l", "lang", str), ("--oem", "oem", int), ("--psm", "psm", int)):
+        if flag in args[:-1]:
+            options[key] = convert(args[args.index(flag) + 1])
+    return options
+
+
+# A small bounded pool of tesserocr APIs shared by all threads. Each API holds
+# a loaded language model (tens of MB) and is not thread-safe, so a thread
+# borrows one for a single image; when all TESSEROCR_POOL_SIZE APIs are busy,
+# the next thread waits for one to be returned instead of loading another
+TESSEROCR_POOL_SIZE = max(1, int(os.getenv("TESSEROCR_POOL_SIZE") or "2"))
+_TESS_POOL = queue.Queue()
+_TESS_CREATED = 0
+_TESS_POOL_LOCK = threading.Lock()
+
+
+# Borrow an API from the pool, creating one while under the limit; None
+# means tesserocr is unavailable and pytesseract should be used
+def _acquire_tess_api():
+    global tesserocr, _TESS_CREATED
+    if tesserocr is None:
+        return None
+    try:
+        return _TESS_POOL.get_nowait()
+    except queue.Empty:
+        pass
+
+    with _TESS_POOL_LOCK:
+        create = _TESS_CREATED < TESSEROCR_POOL_SIZE
+        if create:
+            _TESS_CREATED += 1
+    if create:
+        try:
+            return tesserocr.PyTessBaseAPI(**_tesserocr_options(TESSERACT_CONFIG))
+        except Exception as e:
+            logger.warning("tesserocr init failed – using pytesseract: %s", e)
+            with _TESS_POOL_LOCK:
+                _TESS_CREATED -= 1
+            tesserocr = None
+            return None
+
+    # Wait for a busy API, giving up if tesserocr has since failed to load
+    while True:
+        try:
+            return _TESS_POOL.get(timeout=1)
+        except queue.Empty:
+            if tesserocr is None:
+                return None
+
+
+# Run OCR on one image, in-process when tesserocr is available
+def _image_to_string(img: Image.Image) -> str:
+    api = _acquire_tess_api()
+    if api is None:
+        return pytesseract.image_to_string(img, config=TESSERACT_CONFIG)
+    try:
+        api.SetImage(img)
+        return api.GetUTF8Text()
+    finally:
+        # Drop the image and results before handing the API back
+        api.Clear()
+        _TESS_POOL.put(api)
+
+
+# Worker processes for page OCR, created on first multi-page PDF. Every web
+# server process has its own pool, so the default splits the cores between
+# the WEB_CONCURRENCY processes (gunicorn.conf.py exports its worker count)
+# rather than giving each of them one OCR process per core
+def _default_ocr_concurrency() -> int:
+    web_workers = max(1, int(os.getenv("WEB_CONCURRENCY") or "1"))
+    return max(1, (os.cpu_count() or 1) // web_workers)
+
+
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY") or _default_ocr_concurrency())
+_OCR_POOL: Optional[ProcessPoolExecutor] = None
+_OCR_POOL_LOCK = threading.Lock()
+
+
+def _get_ocr_pool() -> ProcessPoolExecutor:
+    global _OCR_POOL
+    with _OCR_POOL_LOCK:
+        if _OCR_POOL is None:
+            _OCR_POOL = ProcessPoolExecutor(max_workers=OCR_CONCURRENCY)
+        return _OCR_POOL
+
+
+# Drop a pool whose workers died so the next PDF starts a fresh one
+def _discard_ocr_pool():
+    global _OCR_POOL
+    with _OCR_POOL_LOCK:
+        pool, _OCR_POOL = _OCR_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# PDFium is not thread-safe; every call into it goes through this lock
+_PDFIUM_LOCK = threading.Lock()
+
+
+# A forked process must not inherit the parent's APIs, pools or held locks
+def _reset_tess_in_child():
+    global _TESS_POOL, _TESS_CREATED, _TESS_POOL_LOCK
+    global _OCR_POOL, _OCR_POOL_LOCK, _PDFIUM_LOCK
+    _TESS_POOL = queue.Queue()
+    _TESS_CREATED = 0
+    _TESS_POOL_LOCK = threading.Lock()
+    _PDFIUM_LOCK = threading.Lock()
+    _OCR_POOL = None
+    _OCR_POOL_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_tess_in_child)
+
+
+# Grey level below which a pixel becomes black when binarizing
+_BINARIZE_THRESHOLD = 140
+
+
+# Autocontrast + sharpen + threshold fused into one pass over the page;
+# mirrors PIL's autocontrast LUT and 3x3 SHARPEN kernel (edges kept). Written
+# as plain Python and compiled with numba below, only when OpenCV is missing
+def _preprocess_pixels(arr, threshold):
+    h, w = arr.shape
+    lo, hi = 255, 0
+    for y in range(h):
+        for x in range(w):
+            v = arr[y, x]
+            if v < lo:
+                lo = v
+            if v > hi:
+                hi = v
+
+    lut = np.empty(256, np.float64)
+    for i in range(256):
+        if hi <= lo:
+            lut[i] = i
+        else:
+            scale = 255.0 / (hi - lo)
+            lut[i] = min(max(int(i * scale - lo * scale), 0), 255)
+
+    out = np.empty((h, w), np.bool_)
+    for y in range(h):
+        for x in range(w):
+            if y == 0 or x == 0 or y == h - 1 or x == w - 1:
+                v = lut[arr[y, x]]
+            else:
+                ring = (
+                    lut[arr[y - 1, x - 1]] + lut[arr[y - 1, x]] + lut[arr[y - 1, x + 1]]
+                    + lut[arr[y, x - 1]] + lut[arr[y, x + 1]]
+                    + lut[arr[y + 1, x - 1]] + lut[arr[y + 1, x]] + lut[arr[y + 1, x + 1]]
+                )
+                v = min(max(int((32.0 * lut[arr[y, x]] - 2.0 * ring) / 16.0 + 0.5), 0), 255)
+            out[y, x] = v >= threshold
+    return out
+
+
+# Compile (or load from the on-disk cache) at import, not on the first page
+_preprocess_kernel = None
+if numba is not None:
+    try:
+        _preprocess_kernel = numba.njit(cache=True)(_preprocess_pixels)
+        _preprocess_kernel(np.zeros((3, 3), np.uint8), _BINARIZE_THRESHOLD)
+    except Exception as e:
+        logger.warning("numba preprocessing unavailable: %s", e)
+        _preprocess_kernel = None
+
+
+# PIL's 3x3 SHARPEN kernel, for the OpenCV path
+_SHARPEN_KERNEL = np.array([[-2, -2, -2], [-2, 32, -2], [-2, -2, -2]], np.float32) / 16
+
+
+# Autocontrast + sharpen + threshold with OpenCV's vectorized LUT and
+# filter2D; matches the PIL path except on the one-pixel border
+def _preprocess_cv2(arr: np.ndarray) -> np.ndarray:
+    lo, hi, _, _ = cv2.minMaxLoc(arr)
+    if hi > lo:
+        scale = 255.0 / (hi - lo)
+        lut = np.clip((np.arange(256) * scale - lo * scale).astype(np.int64), 0, 255)
+        arr = cv2.LUT(arr, lut.astype(np.uint8))
+    arr = cv2.filter2D(arr, -1, _SHARPEN_KERNEL)
+    return arr >= _BINARIZE_THRESHOLD
+
+
+# A page with fewer mid-grey pixels than this share is already clean black
+# on white (e.g. rendered from a born-digital PDF); rendered text pages sit
+# around 1.5-3.5%, mostly anti-aliased glyph edges
+_CLEAN_MIDTONE_RATIO = 0.05
+
+
+# Judged on every 4th pixel of every 4th row; a full histogram would cost
+# about as much as the preprocessing it is meant to skip
+def _is_clean_page(img: Image.Image) -> bool:
+    sample = np.asarray(img)[::4, ::4]
+    midtones = np.count_nonzero((sample >= 32) & (sample < 224))
+    return midtones < _CLEAN_MIDTONE_RATIO * sample.size
+
+
 # Apply basic image preprocessing to improve OCR accuracy
 def preprocess_image(img: Image.Image) -> Image.Image:
     try:
-        img = img.convert("L")
+        if img.mode != "L":
+            img = img.convert("L")
+        # Binarizing a clean page only costs time and can clip thin strokes;
+        # Tesseract thresholds the greyscale image itself
+        if _is_clean_page(img):
+            return img
+        if cv2 is not None:
+            return Image.fromarray(_preprocess_cv2(np.asarray(img)))
+        if _preprocess_kernel is not None:
+            arr = np.ascontiguousarray(np.asarray(img))
+            return Image.fromarray(_preprocess_kernel(arr, _BINARIZE_THRESHOLD))
         img = ImageOps.autocontrast(img)
         img = img.filter(ImageFilter.SHARPEN)
-        img = img.point(lambda x: 0 if x < 140 else 255, "1")
+        # One vectorized compare; a boolean array converts straight to mode "1"
+        img = Image.fromarray(np.asarray(img) >= _BINARIZE_THRESHOLD)
     except Exception as e:
         logger.debug("Image preprocessing failed: %s", e)
         return img
@@ -80,58 +349,303 @@ def preprocess_image(img: Image.Image) -> Image.Image:
     return img
 
 
-# Perform OCR on a PDF file by converting pages to images
-def pdf_to_text_via_ocr(
-    path: str,
-    dpi: int = 300,
-    first_n_pages: Optional[int] = None,
-) -> str:
-    if not (convert_from_path or convert_from_bytes):
-        logger.error("pdf2image not installed – cannot OCR PDFs")
+# OCR a single (page number, image) pair; top-level so it can run in a
+# worker process
+def _ocr_one_page(job) -> str:
+    idx, img = job
+    try:
+        img = preprocess_image(img)
+        return _image_to_string(img).strip()
+    except Exception as e:
+        logger.exception("OCR failed on page %d: %s", idx, e)
         return ""
 
-    images = []
 
+# OCR results are cached on disk by file content, so re-processing the same
+# PDF or image (from another endpoint, or a re-upload) skips rendering and
+# Tesseract. app.py points the cache at a private folder in its storage dir
+# unless OCR_CACHE_DIR is set; with neither, nothing is cached.
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR") or ""
+
+# Entries expire after OCR_CACHE_MAX_AGE seconds (document text should not
+# outlive its use indefinitely), and the oldest are evicted once the cache
+# exceeds OCR_CACHE_MAX_MB
+OCR_CACHE_MAX_AGE = float(os.getenv("OCR_CACHE_MAX_AGE") or 7 * 86400)
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_MB") or "256") * 1024 * 1024
+
+# Minimum seconds between two prunes of the cache folder
+_OCR_CACHE_PRUNE_INTERVAL = 600.0
+_ocr_cache_pruned_at = 0.0
+
+
+def _ocr_cache_key(path: str, *params) -> Optional[str]:
+    if not OCR_CACHE_DIR:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
     try:
-        if os.path.exists(path) and convert_from_path:
-            images = convert_from_path(path, dpi=dpi)
-        else:
-            with open(path, "rb") as f:
-                images = convert_from_bytes(f.read(), dpi=dpi)
-    except Exception as e:
-        logger.exception("PDF to image conversion failed: %s", e)
-        return ""
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    config = hashlib.blake2b(TESSERACT_CONFIG.encode("utf-8"), digest_size=4).hexdigest()
+    return "-".join([digest.hexdigest(), config, *map(str, params)])
+
+
+def _ocr_cache_get(key: Optional[str]) -> Optional[str]:
+    if not key:
+        return None
+    try:
+        with open(os.path.join(OCR_CACHE_DIR, f"{key}.txt"), encoding="utf-8") as f:
+            if time.time() - os.fstat(f.fileno()).st_mtime > OCR_CACHE_MAX_AGE:
+                return None
+            return f.read()
+    except OSError:
+        return None
 
-    if not images:
-        return ""
 
+def _ocr_cache_put(key: Optional[str], text: str):
+    # Empty output may be a transient failure (e.g. Poppler missing); don't pin it
+    if not key or not text:
+        return
+    try:
+        os.makedirs(OCR_CACHE_DIR, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=OCR_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, os.path.join(OCR_CACHE_DIR, f"{key}.txt"))
+    except OSError as e:
+        logger.debug("Could not write OCR cache: %s", e)
+    _prune_ocr_cache()
+
+
+# Delete expired entries (and leftover temp files), then the oldest entries
+# while the folder is over its size limit; runs at most every few minutes
+def _prune_ocr_cache(force: bool = False):
+    global _ocr_cache_pruned_at
+    now = time.time()
+    if not force and now - _ocr_cache_pruned_at < _OCR_CACHE_PRUNE_INTERVAL:
+        return
+    _ocr_cache_pruned_at = now
+
+    entries = []
+    try:
+        with os.scandir(OCR_CACHE_DIR) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                expired = now - st.st_mtime > (
+                    3600 if entry.name.endswith(".tmp") else OCR_CACHE_MAX_AGE
+                )
+                if expired:
+                    _remove_quietly(entry.path)
+                elif entry.name.endswith(".txt"):
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+    except OSError as e:
+        logger.debug("Could not prune OCR cache: %s", e)
+        return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= OCR_CACHE_MAX_BYTES:
+            break
+        _remove_quietly(path)
+        total -= size
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Read the embedded text layer of an open PDFium page; call under _PDFIUM_LOCK
+def _page_text(page) -> str:
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range().replace("\r\n", "\n")
+    finally:
+        textpage.close()
+
+
+# Yield the embedded text layer of each PDF page via PDFium (no OCR)
+def iter_pdf_text_pages(path: str) -> Iterator[str]:
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(path)
+    try:
+        for i in range(len(pdf)):
+            with _PDFIUM_LOCK:
+                page = pdf[i]
+                try:
+                    text = _page_text(page)
+                finally:
+                    page.close()
+            yield text
+    finally:
+        with _PDFIUM_LOCK:
+            pdf.close()
+
+
+# Number of pages rendered and OCR'd together; bounds peak memory to one chunk
+PAGE_CHUNK = 10
+
+
+# Pages whose text layer has at least this many non-blank characters are
+# taken as-is instead of being rendered and OCR'd
+NATIVE_TEXT_MIN_CHARS = 50
+
+
+# Whether an open PDFium page draws any image (a scan); call under _PDFIUM_LOCK
+def _page_has_images(page) -> bool:
+    images = page.get_objects(filter=(pdfium.raw.FPDF_PAGEOBJ_IMAGE,))
+    return next(images, None) is not None
+
+
+# Yield the pages of a PDF as greyscale PIL images, one at a time (OCR only
+# needs one channel, so neither renderer produces RGB); PDFium renders in
+# process, Poppler (pdf2image) is the fallback. With PDFium, a page whose text
+# layer is usable is yielded as that text (a str) instead: one with at least
+# NATIVE_TEXT_MIN_CHARS, or a short one (title, page number) with no scan on it
+def _render_pdf_pages(path: str, dpi: int, first_n_pages: Optional[int] = None):
+    if pdfium is not None:
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(path)
+        try:
+            n_pages = len(pdf)
+            if first_n_pages:
+                n_pages = min(n_pages, first_n_pages)
+            for i in range(n_pages):
+                with _PDFIUM_LOCK:
+                    page = pdf[i]
+                    try:
+                        text = _page_text(page)
+                        n_chars = len(text.strip())
+                        if n_chars >= NATIVE_TEXT_MIN_CHARS or (
+                            n_chars and not _page_has_images(page)
+                        ):
+                            item = text
+                        else:
+                            item = page.render(scale=dpi / 72, grayscale=True).to_pil()
+                    finally:
+                        page.close()
+                yield item
+        finally:
+            with _PDFIUM_LOCK:
+                pdf.close()
+        return
+
+    # Let Poppler read the file itself (no copy into Python memory), split the
+    # pages over several pdftoppm processes, and stop at the last needed page;
+    # JPEG output keeps the pipe from Poppler small
+    render_opts = {
+        "dpi": dpi,
+        "grayscale": True,
+        "thread_count": os.cpu_count() or 1,
+        "fmt": "jpeg",
+        "jpegopt": {"quality": 85},
+    }
+
+    # Render PAGE_CHUNK pages per Poppler call so only one chunk of bitmaps
+    # is in memory at a time
+    n_pages = pdfinfo_from_path(path)["Pages"]
     if first_n_pages:
-        images = images[:first_n_pages]
+        n_pages = min(n_pages, first_n_pages)
+    for first in range(1, n_pages + 1, PAGE_CHUNK):
+        last = min(first + PAGE_CHUNK - 1, n_pages)
+        yield from convert_from_path(path, first_page=first, last_page=last, **render_opts)
 
-    pages_text = []
 
-    for idx, img in enumerate(images, start=1):
+# OCR a batch of (page number, image) pairs, in the worker pool when useful
+def _ocr_pages(jobs) -> list:
+    if OCR_CONCURRENCY > 1 and len(jobs) > 1:
         try:
-            img = preprocess_image(img)
-            text = pytesseract.image_to_string(img)
-            if text.strip():
-                pages_text.append(text.strip())
+            return list(_get_ocr_pool().map(_ocr_one_page, jobs))
         except Exception as e:
-            logger.exception("OCR failed on page %d: %s", idx, e)
+            logger.warning("Parallel OCR failed, retrying serially: %s", e)
+            _discard_ocr_pool()
+    return [_ocr_one_page(job) for job in jobs]
+
+
+# Yield the text of each PDF page in order: the text layer where it is usable,
+# otherwise OCR of the rendered page, so scanned pages of a mixed PDF are read
+# too. Pages are rendered and OCR'd PAGE_CHUNK at a time (each chunk's bitmaps
+# are released before the next is rendered) and OCR output is cached per page.
+# Render errors propagate to the caller after the pages read so far.
+def iter_pdf_pages_with_ocr(
+    path: str,
+    dpi: int = 200,
+    first_n_pages: Optional[int] = None,
+) -> Iterator[str]:
+    if not (pdfium or convert_from_path):
+        logger.error("No PDF renderer (pypdfium2 or pdf2image) – cannot OCR PDFs")
+        return
 
-    return "\n\n".join(pages_text).strip()
+    doc_key = _ocr_cache_key(path, dpi)
+    pages = enumerate(_render_pdf_pages(path, dpi, first_n_pages), start=1)
+
+    while True:
+        jobs = list(itertools.islice(pages, PAGE_CHUNK))
+        if not jobs:
+            return
+
+        # Only rendered pages missing from the cache go to Tesseract
+        texts = {}
+        ocr_jobs = []
+        for page_no, page in jobs:
+            if isinstance(page, str):
+                texts[page_no] = page
+                continue
+            key = f"{doc_key}-p{page_no}" if doc_key else None
+            cached = _ocr_cache_get(key)
+            if cached is not None:
+                texts[page_no] = cached
+            else:
+                ocr_jobs.append((page_no, page))
+        if ocr_jobs:
+            for (page_no, _), text in zip(ocr_jobs, _ocr_pages(ocr_jobs)):
+                _ocr_cache_put(f"{doc_key}-p{page_no}" if doc_key else None, text)
+                texts[page_no] = text
+        del jobs, ocr_jobs
+
+        for page_no in sorted(texts):
+            yield texts[page_no]
+
+
+# Read a whole PDF's text, OCR-ing the pages that have no usable text layer
+def pdf_to_text_via_ocr(
+    path: str,
+    dpi: int = 200,
+    first_n_pages: Optional[int] = None,
+) -> str:
+    pages_text = []
+    try:
+        for text in iter_pdf_pages_with_ocr(path, dpi, first_n_pages):
+            pages_text.append(text.strip())
+    except Exception as e:
+        logger.exception("PDF to image conversion failed: %s", e)
+    return "\n\n".join(t for t in pages_text if t).strip()
 
 
 # Perform OCR on a single image file
 def image_file_to_text(path: str) -> str:
     try:
-        if not getattr(pytesseract.pytesseract, "tesseract_cmd", None):
+        if tesserocr is None and not getattr(pytesseract.pytesseract, "tesseract_cmd", None):
             logger.error("Tesseract not configured")
             return ""
 
+        cache_key = _ocr_cache_key(path, "image")
+        cached = _ocr_cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         img = Image.open(path)
         img = preprocess_image(img)
-        return pytesseract.image_to_string(img).strip()
+        text = _image_to_string(img).strip()
+        _ocr_cache_put(cache_key, text)
+        return text
 
     except Exception as e:
         logger.exception("Image OCR failed: %s", e)
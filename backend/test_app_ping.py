@@ -1,3 +1,9 @@
+import time
+
+import pytest
+from flask_wtf.csrf import generate_csrf, validate_csrf
+from wtforms import ValidationError
+
 from app import app
 
 
@@ -6,3 +12,17 @@ def test_ping():
     resp = client.get("/ping")
     assert resp.status_code == 200
     assert resp.get_json() == {"status": "ok"}
+
+
+# CSRF tokens are accepted within CSRF_TIME_LIMIT and rejected after it
+def test_csrf_token_expires(monkeypatch):
+    limit = app.config["WTF_CSRF_TIME_LIMIT"]
+    assert limit
+    with app.test_request_context():
+        token = generate_csrf()
+        validate_csrf(token)
+
+        later = time.time() + limit + 1
+        monkeypatch.setattr("itsdangerous.timed.time.time", lambda: later)
+        with pytest.raises(ValidationError):
+            validate_csrf(token)
@@ -0,0 +1,42 @@
+# backend/test_auth.py
+
+import re
+
+import pytest
+
+import auth
+
+
+def test_bcrypt_rounds_read_at_hash_time(monkeypatch):
+    monkeypatch.setattr(auth, "_ARGON2", None)
+    monkeypatch.setenv("BCRYPT_ROUNDS", "5")
+    stored = auth.hash_password("Secret1!")
+    assert stored.startswith("$2b$05$")
+    assert auth.verify_password("Secret1!", stored)
+
+    # An empty value (as in .env.example) means the default
+    monkeypatch.setenv("BCRYPT_ROUNDS", "")
+    assert auth.hash_password("Secret1!").startswith("$2b$12$")
+
+
+# The rules the single-pass check replaced, as regexes
+def _regex_rules(password):
+    if len(password) < 8:
+        return False, "Minimum 8 characters required"
+    for pattern, message in (
+        (r"[A-Z]", "Add at least one uppercase letter"),
+        (r"[a-z]", "Add at least one lowercase letter"),
+        (r"\d", "Add at least one number"),
+        (r"[@$!%*?&]", "Add at least one special character"),
+    ):
+        if not re.search(pattern, password):
+            return False, message
+    return True, ""
+
+
+@pytest.mark.parametrize("password", [
+    "", "Ab1!", "Test123!", "test123!", "TEST123!", "Testabc!", "Test1234",
+    "Test123#", "Ünïcode1!", "Test²³¹!x", "Test٣abc!", "Ｔest123!", "Pass word 9 ?",
+])
+def test_validate_password_matches_regex_rules(password):
+    assert auth.validate_password(password) == _regex_rules(password)
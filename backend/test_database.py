@@ -0,0 +1,185 @@
+# backend/test_database.py
+
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from database import init_db, get_db, import_file_map_json
+
+
+def test_import_file_map_json(tmp_path):
+    init_db()
+    db = get_db()
+    db.execute("INSERT OR REPLACE INTO file_map VALUES ('kept.pdf', 'new_kept.pdf', 2.0)")
+    db.commit()
+
+    path = tmp_path / "file_map.json"
+    path.write_text(json.dumps({
+        "notes.txt": {"unique_name": "abc_notes.txt", "timestamp": 1700000000.5},
+        "kept.pdf": {"unique_name": "old_kept.pdf", "timestamp": 1.0},
+        "broken": "not-a-dict",
+    }), encoding="utf-8")
+
+    import_file_map_json(str(path))
+
+    rows = dict(db.execute(
+        "SELECT original, unique_name FROM file_map WHERE original IN ('notes.txt', 'kept.pdf', 'broken')"
+    ).fetchall())
+    assert rows == {"notes.txt": "abc_notes.txt", "kept.pdf": "new_kept.pdf"}
+    assert not path.exists()
+    assert (tmp_path / "file_map.json.imported").exists()
+
+    # A second start finds nothing left to import
+    import_file_map_json(str(path))
+
+
+# A legacy file that is not an object of entries is left alone, and a
+# timestamp that does not parse is stored as 0
+@pytest.mark.parametrize("content", [[1, 2], "just a string", 42])
+def test_import_file_map_json_ignores_non_object(tmp_path, content):
+    init_db()
+    path = tmp_path / "file_map.json"
+    path.write_text(json.dumps(content), encoding="utf-8")
+
+    import_file_map_json(str(path))
+    assert path.exists()
+
+
+def test_import_file_map_json_bad_timestamp(tmp_path):
+    init_db()
+    path = tmp_path / "file_map.json"
+    path.write_text(json.dumps({
+        "bad_ts.txt": {"unique_name": "u_bad_ts.txt", "timestamp": "yesterday"},
+        "list_ts.txt": {"unique_name": "u_list_ts.txt", "timestamp": [1]},
+    }), encoding="utf-8")
+
+    import_file_map_json(str(path))
+    rows = dict(get_db().execute(
+        "SELECT original, ts FROM file_map WHERE original IN ('bad_ts.txt', 'list_ts.txt')"
+    ).fetchall())
+    assert rows == {"bad_ts.txt": 0.0, "list_ts.txt": 0.0}
+
+
+# Point database.py at a fresh file for one test, restoring the shared
+# per-thread connection afterwards
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    import database
+
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "legacy.db"))
+    saved = getattr(database._local, "conn", None)
+    database._local.conn = None
+    yield database.DB_PATH
+    if database._local.conn is not None:
+        database._local.conn.close()
+    database._local.conn = saved
+
+
+def test_migrate_created_at_from_legacy_schema(fresh_db):
+    # The schema and row formats written before created_at became integer ms
+    legacy = sqlite3.connect(fresh_db)
+    legacy.executescript("""
+        CREATE TABLE users (id TEXT PRIMARY KEY, email TEXT UNIQUE NOT NULL,
+                            password TEXT NOT NULL, created_at TEXT NOT NULL);
+        CREATE TABLE conversations (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL,
+                                    role TEXT NOT NULL, content TEXT NOT NULL,
+                                    created_at TEXT NOT NULL, session_id TEXT);
+        CREATE TABLE chat_sessions (id TEXT PRIMARY KEY, user_id TEXT NOT NULL,
+                                    title TEXT NOT NULL, created_at TEXT NOT NULL);
+        INSERT INTO users VALUES ('u1', 'a@example.com', 'x', '2024-01-02T03:04:05.678000');
+        INSERT INTO conversations (user_id, role, content, created_at, session_id)
+            VALUES ('u1', 'user', 'hi', '2024-01-02T03:04:05', 's1'),
+                   ('u1', 'assistant', 'hello', '2024-01-02T03:04:06', 's1'),
+                   ('u1', 'user', 'gone', '2024-01-02T03:04:07', 's1');
+        DELETE FROM conversations WHERE id = 3;
+        INSERT INTO chat_sessions VALUES ('s1', 'u1', 'iso', '2024-01-02T03:04:05'),
+                                         ('s2', 'u1', 'epoch', '1700000000'),
+                                         ('s3', 'u1', 'float', '1700000001.75');
+    """)
+    legacy.commit()
+    legacy.close()
+
+    init_db()
+    init_db()  # a second start finds nothing left to migrate
+    db = get_db()
+
+    for table in ("users", "conversations", "chat_sessions"):
+        types = {c["name"]: c["type"] for c in db.execute(f"PRAGMA table_info({table})")}
+        assert types["created_at"] == "INTEGER"
+
+    assert db.execute("SELECT created_at FROM users").fetchone()[0] == 1704164645678
+    assert [tuple(r) for r in db.execute(
+        "SELECT id, content, created_at, session_id FROM conversations ORDER BY id"
+    )] == [(1, "hi", 1704164645000, "s1"), (2, "hello", 1704164646000, "s1")]
+    assert dict(db.execute("SELECT id, created_at FROM chat_sessions").fetchall()) == {
+        "s1": 1704164645000, "s2": 1700000000000, "s3": 1700000001000,
+    }
+
+    # The AUTOINCREMENT high-water mark survives, so id 3 is not reused
+    cur = db.execute(
+        "INSERT INTO conversations (user_id, role, content, created_at, session_id) "
+        "VALUES ('u1', 'user', 'new', 0, 's1')"
+    )
+    assert cur.lastrowid == 4
+
+
+# A worker that starts while another is migrating waits for the write lock
+# and then sees the new schema, rather than converting the values again
+def test_migrate_created_at_waits_for_concurrent_migration(fresh_db):
+    import database
+
+    setup = sqlite3.connect(fresh_db)
+    setup.execute("PRAGMA journal_mode=WAL")
+    setup.execute("CREATE TABLE chat_sessions (id TEXT PRIMARY KEY, created_at TEXT NOT NULL)")
+    setup.execute("INSERT INTO chat_sessions VALUES ('s1', '1700000000')")
+    setup.commit()
+
+    # The first worker is mid-migration: table rebuilt, not yet committed
+    first = sqlite3.connect(fresh_db, isolation_level=None)
+    first.execute("BEGIN IMMEDIATE")
+    first.execute("DROP TABLE chat_sessions")
+    first.execute("CREATE TABLE chat_sessions (id TEXT PRIMARY KEY, created_at INTEGER NOT NULL)")
+    first.execute("INSERT INTO chat_sessions VALUES ('s1', 1700000000000)")
+
+    errors = []
+
+    def second_worker():
+        conn = database._connect()
+        try:
+            database._migrate_created_at(conn, "chat_sessions")
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    worker = threading.Thread(target=second_worker)
+    worker.start()
+    time.sleep(0.3)
+    first.execute("COMMIT")
+    first.close()
+    worker.join()
+
+    assert errors == []
+    assert setup.execute("SELECT created_at FROM chat_sessions").fetchone()[0] == 1700000000000
+    setup.close()
+
+
+# A model_cache table with the old semantic-lookup columns is recreated
+def test_init_db_recreates_legacy_model_cache(fresh_db):
+    legacy = sqlite3.connect(fresh_db)
+    legacy.execute(
+        "CREATE TABLE model_cache (key TEXT PRIMARY KEY, params TEXT NOT NULL, embedding BLOB, "
+        "response TEXT NOT NULL, created_at REAL NOT NULL, ttl REAL NOT NULL)"
+    )
+    legacy.execute("INSERT INTO model_cache VALUES ('k', 'p', NULL, 'r', 0, 1)")
+    legacy.commit()
+    legacy.close()
+
+    init_db()
+    db = get_db()
+    cols = [c["name"] for c in db.execute("PRAGMA table_info(model_cache)")]
+    assert cols == ["key", "response", "created_at", "ttl"]
+    assert db.execute("SELECT COUNT(*) FROM model_cache").fetchone()[0] == 0
@@ -0,0 +1,51 @@
+# backend/test_model_wrapper.py
+
+import pytest
+
+import model_wrapper
+from database import init_db, get_db
+
+
+# A fake model that counts calls and answers with the prompt it was given
+@pytest.fixture
+def fake_model(monkeypatch):
+    init_db()
+    get_db().execute("DELETE FROM model_cache")
+    get_db().commit()
+
+    calls = []
+
+    def call_model(prompt, cfg):
+        calls.append(prompt)
+        return f"answer to: {prompt}"
+
+    monkeypatch.setattr(model_wrapper, "_MODEL", object())
+    monkeypatch.setattr(model_wrapper, "_call_model", call_model)
+    monkeypatch.setattr(model_wrapper, "_extract_text", lambda resp: resp)
+    return calls
+
+
+def test_cache_is_scoped_per_user(fake_model):
+    assert model_wrapper._generate("my salary is $50k", cache_scope="alice") == "answer to: my salary is $50k"
+    model_wrapper._generate("my salary is $50k", cache_scope="alice")
+    assert len(fake_model) == 1
+
+    model_wrapper._generate("my salary is $50k", cache_scope="bob")
+    assert len(fake_model) == 2
+
+
+def test_no_scope_is_not_cached(fake_model):
+    model_wrapper._generate("hello")
+    model_wrapper._generate("hello")
+    assert len(fake_model) == 2
+    assert get_db().execute("SELECT COUNT(*) FROM model_cache").fetchone()[0] == 0
+
+
+def test_expired_rows_are_deleted_on_write(fake_model, monkeypatch):
+    monkeypatch.setattr(model_wrapper, "CACHE_TTL", -1.0)
+    model_wrapper._generate("old", cache_scope="alice")
+    monkeypatch.setattr(model_wrapper, "CACHE_TTL", 60.0)
+    model_wrapper._generate("new", cache_scope="alice")
+
+    rows = get_db().execute("SELECT response FROM model_cache").fetchall()
+    assert [r["response"] for r in rows] == ["answer to: new"]
@@ -0,0 +1,181 @@
+# backend/test_ocr.py
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter, ImageOps
+
+import ocr
+import utils
+
+
+def test_ocr_cache_expires_and_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(ocr, "OCR_CACHE_MAX_BYTES", 10)
+    src = tmp_path / "doc.pdf"
+    src.write_bytes(b"%PDF-1.4 test")
+
+    key = ocr._ocr_cache_key(str(src), 200)
+    ocr._ocr_cache_put(key, "page text")
+    assert ocr._ocr_cache_get(key) == "page text"
+    assert oct(os.stat(ocr.OCR_CACHE_DIR).st_mode & 0o777) == "0o700"
+
+    # Past the maximum age an entry is a miss, and pruning deletes it
+    old = time.time() - ocr.OCR_CACHE_MAX_AGE - 1
+    os.utime(os.path.join(ocr.OCR_CACHE_DIR, f"{key}.txt"), (old, old))
+    assert ocr._ocr_cache_get(key) is None
+    ocr._prune_ocr_cache(force=True)
+    assert os.listdir(ocr.OCR_CACHE_DIR) == []
+
+    # Over the size limit, the oldest entries go first
+    for i, name in enumerate(["a", "b", "c"]):
+        path = os.path.join(ocr.OCR_CACHE_DIR, f"{name}.txt")
+        with open(path, "w") as f:
+            f.write("12345")
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    ocr._prune_ocr_cache(force=True)
+    assert sorted(os.listdir(ocr.OCR_CACHE_DIR)) == ["b.txt", "c.txt"]
+
+
+def test_ocr_cache_disabled_without_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_CACHE_DIR", "")
+    src = tmp_path / "img.png"
+    src.write_bytes(b"png")
+    assert ocr._ocr_cache_key(str(src), "image") is None
+
+
+SPEC_PDF = "/usr/share/doc/shared-mime-info/shared-mime-info-spec.pdf"
+
+
+# A PDF whose first page has a text layer and whose second is a bare scan
+def _mixed_pdf(tmp_path):
+    if ocr.pdfium is None or not os.path.exists(SPEC_PDF):
+        pytest.skip("needs pypdfium2 and a sample text PDF")
+    scan = tmp_path / "scan.pdf"
+    Image.new("L", (200, 200), 255).save(scan)
+    doc = ocr.pdfium.PdfDocument.new()
+    doc.import_pages(ocr.pdfium.PdfDocument(SPEC_PDF), [0])
+    doc.import_pages(ocr.pdfium.PdfDocument(str(scan)))
+    path = tmp_path / "mixed.pdf"
+    doc.save(str(path))
+    return str(path)
+
+
+# Only the scanned page of a mixed PDF is OCR'd, and its text is kept
+def test_mixed_pdf_ocrs_only_scanned_pages(tmp_path, monkeypatch):
+    path = _mixed_pdf(tmp_path)
+    calls = []
+
+    def fake_ocr_pages(jobs):
+        calls.append([page_no for page_no, _ in jobs])
+        return ["scanned page text"] * len(jobs)
+
+    monkeypatch.setattr(ocr, "_ocr_pages", fake_ocr_pages)
+    monkeypatch.setattr(ocr, "OCR_CACHE_DIR", str(tmp_path / "cache"))
+
+    text = utils.extract_text_from_pdf(path)
+    assert calls == [[2]]
+    assert "Shared MIME-info" in text and text.endswith("scanned page text")
+    assert list(utils._iter_pdf_chunks(path))[-1].endswith("scanned page text")
+
+    # The OCR'd page is cached; the second read renders but does not OCR
+    assert calls == [[2]]
+
+
+class _FakeTessAPI:
+    created = 0
+
+    def __init__(self, **options):
+        type(self).created += 1
+        self.busy = False
+
+    def SetImage(self, img):
+        assert not self.busy, "API shared between threads"
+        self.busy = True
+        self.img = img
+
+    def GetUTF8Text(self):
+        time.sleep(0.01)
+        return self.img
+
+    def Clear(self):
+        self.busy = False
+
+
+# Image OCR borrows from a bounded pool of APIs, reused across threads
+def test_tesserocr_api_pool_is_bounded_and_reused(monkeypatch):
+    class FakeTesserocr:
+        PyTessBaseAPI = _FakeTessAPI
+
+    _FakeTessAPI.created = 0
+    monkeypatch.setattr(ocr, "tesserocr", FakeTesserocr)
+    monkeypatch.setattr(ocr, "TESSEROCR_POOL_SIZE", 2)
+    monkeypatch.setattr(ocr, "_TESS_POOL", queue.Queue())
+    monkeypatch.setattr(ocr, "_TESS_CREATED", 0)
+
+    results = {}
+
+    def run_threads(ids):
+        threads = [
+            threading.Thread(target=lambda i=i: results.update({i: ocr._image_to_string(f"page {i}")}))
+            for i in ids
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    # Many short-lived threads at once, then one after another
+    run_threads(range(8))
+    for i in range(8, 11):
+        run_threads([i])
+
+    assert results == {i: f"page {i}" for i in range(11)}
+    assert _FakeTessAPI.created == 2
+    assert ocr._TESS_POOL.qsize() == 2
+
+
+# Each web worker gets its share of the cores for OCR, never less than one
+@pytest.mark.parametrize("web, cpus, expected", [(None, 8, 8), ("4", 8, 2), ("16", 8, 1), ("", 2, 2)])
+def test_default_ocr_concurrency_splits_cores(web, cpus, expected, monkeypatch):
+    if web is None:
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    else:
+        monkeypatch.setenv("WEB_CONCURRENCY", web)
+    monkeypatch.setattr(ocr.os, "cpu_count", lambda: cpus)
+    assert ocr._default_ocr_concurrency() == expected
+
+
+# The PIL preprocessing path the fused kernel replaces
+def _pil_preprocess(arr):
+    img = ImageOps.autocontrast(Image.fromarray(arr))
+    img = img.filter(ImageFilter.SHARPEN)
+    return np.asarray(img) >= ocr._BINARIZE_THRESHOLD
+
+
+def _sample_pages():
+    rng = np.random.default_rng(7)
+    noise = rng.integers(0, 256, (37, 53), dtype=np.uint8)
+    narrow = rng.integers(90, 160, (40, 40), dtype=np.uint8)
+    gradient = np.tile(np.arange(0, 256, 4, dtype=np.uint8), (20, 1))
+    flat = np.full((9, 9), 128, np.uint8)
+    text = np.full((30, 60), 230, np.uint8)
+    text[10:20, 5:55:3] = 20
+    return [noise, narrow, gradient, flat, text]
+
+
+# The fused kernel (as Python, and compiled when numba is installed) is
+# pixel-identical to autocontrast + SHARPEN + threshold in PIL
+@pytest.mark.parametrize("compiled", [False, True])
+def test_preprocess_kernel_matches_pil(compiled):
+    kernel = ocr._preprocess_pixels
+    if compiled:
+        numba = pytest.importorskip("numba")
+        kernel = numba.njit(kernel)
+    for arr in _sample_pages():
+        expected = _pil_preprocess(arr)
+        assert np.array_equal(kernel(arr, ocr._BINARIZE_THRESHOLD), expected)
@@ -0,0 +1,65 @@
+# backend/test_utils.py
+
+import random
+
+import pytest
+
+import utils
+
+
+def _random_page(rng):
+    words = ["alpha", "beta", "gamma.", "delta", "\n", "epsilon. ", "  ", "zeta\n\n"]
+    return " ".join(rng.choice(words) for _ in range(rng.randrange(0, 120)))
+
+
+def _assert_chunks_match(pages, max_chars, monkeypatch):
+    monkeypatch.setattr(utils, "pdfium", object())
+    monkeypatch.setattr(utils, "iter_pdf_pages_with_ocr", lambda path: iter(pages))
+
+    text = "\n".join(p for p in pages if p.strip())
+    expected = [c for c in utils._chunk_text(text, max_chars=max_chars) if c]
+    assert list(utils._iter_pdf_chunks("doc.pdf", max_chars)) == expected
+
+
+# Streaming chunks straight off the pages must give exactly the chunks of
+# the joined document text
+@pytest.mark.parametrize("pages, max_chars", [
+    (["a" * 20], 20),
+    (["a" * 21], 20),
+    (["one two.", "", "   ", "three four five six seven"], 20),
+    # Trailing whitespace past the window is the end of the text, not a cut
+    (["on  epsilon. lpha epsilon.  zeta\n\n gamma. zeta\n"], 20),
+    (["sentence one. sentence two.\nline three\n"] * 5, 30),
+])
+def test_iter_pdf_chunks_edge_cases(pages, max_chars, monkeypatch):
+    _assert_chunks_match(pages, max_chars, monkeypatch)
+
+
+# The same property over a few fixed random documents
+def test_iter_pdf_chunks_matches_chunk_text(monkeypatch):
+    for seed in [*range(20), 182]:
+        rng = random.Random(seed)
+        pages = [_random_page(rng) for _ in range(rng.randrange(1, 8))]
+        max_chars = rng.choice([20, 50, 120, 400])
+        if not any(p.strip() for p in pages):
+            pages.append("tail")
+        _assert_chunks_match(pages, max_chars, monkeypatch)
+
+
+# Summaries stream out while chunks are still being produced, with at most
+# SUMMARIZE_CONCURRENCY chunks pulled ahead of the consumer
+def test_summarize_chunks_streams_before_input_is_exhausted(monkeypatch):
+    monkeypatch.setattr(utils, "SUMMARIZE_CONCURRENCY", 2)
+    monkeypatch.setattr(utils, "_summarize_chunk", lambda chunk, cache_scope=None: (chunk.upper(), None))
+    pulled = []
+
+    def chunks():
+        for i in range(6):
+            pulled.append(i)
+            yield f"chunk {i}"
+
+    results = utils._summarize_chunks(chunks())
+    assert next(results) == ("CHUNK 0", None)
+    assert pulled == [0, 1, 2]
+    assert list(results) == [(f"CHUNK {i}", None) for i in range(1, 6)]
+    assert pulled == list(range(6))
@@ -1,16 +1,55 @@
 # backend/utils.py
 
 import os
-from typing import List, Dict, Any, Optional
+import itertools
+import collections
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
 
 from model_wrapper import get_wrapper
-from ocr import pdf_to_text_via_ocr, image_file_to_text
+from ocr import (
+    pdf_to_text_via_ocr,
+    image_file_to_text,
+    iter_pdf_text_pages,
+    iter_pdf_pages_with_ocr,
+    pdfium,
+)
+
+
+# Configure logger for document-processing helpers
+logger = logging.getLogger("utils")
+logger.setLevel(logging.INFO)
+
+
+# Import optional document parsers once at startup
+try:
+    from PyPDF2 import PdfReader
+except Exception:
+    PdfReader = None
+    logger.warning("PyPDF2 not available")
+
+try:
+    import docx
+except Exception:
+    docx = None
+    logger.warning("python-docx not available – DOCX extraction disabled")
+
+try:
+    import pandas as pd
+except Exception:
+    pd = None
+    logger.warning("pandas not available – CSV/Excel preview disabled")
 
 
 # Initialize the shared model wrapper instance
 _model = get_wrapper()
 
 
+# Maximum number of PDF chunks summarized at the same time
+SUMMARIZE_CONCURRENCY = int(os.getenv("SUMMARIZE_CONCURRENCY") or "8")
+
+
 # Split long text into manageable chunks for safe model processing
 def _chunk_text(text: str, max_chars: int = 3800) -> List[str]:
     if not text:
@@ -28,13 +67,13 @@ def _chunk_text(text: str, max_chars: int = 3800) -> List[str]:
         end = min(start + max_chars, length)
 
         if end < length:
-            slice_ = text[start:end]
-            last_nl = slice_.rfind("\n")
-            last_period = slice_.rfind(". ")
+            # Search the original string in place; no per-chunk slice copy
+            last_nl = text.rfind("\n", start, end)
+            last_period = text.rfind(". ", start, end)
             cut = max(last_nl, last_period)
 
-            if cut > int(max_chars * 0.5):
-                end = start + cut + 1
+            if cut - start > int(max_chars * 0.5):
+                end = cut + 1
 
         chunks.append(text[start:end].strip())
         start = end
@@ -42,42 +81,123 @@ def _chunk_text(text: str, max_chars: int = 3800) -> List[str]:
     return chunks
 
 
+# Returned when a PDF yields no text at all
+_PDF_NO_TEXT = (
+    "(error) Could not extract text from PDF. "
+    "This may be a scanned document or OCR/Poppler is not configured."
+)
+
+
 # Extract readable text from a PDF file with OCR fallback
 def extract_text_from_pdf(path: str, use_ocr: bool = True) -> str:
     text = ""
 
-    try:
-        from PyPDF2 import PdfReader
-        reader = PdfReader(path)
-        for page in reader.pages:
-            try:
-                page_text = page.extract_text() or ""
+    # PDFium (C++) reads the text layer far faster than pure-Python PyPDF2;
+    # with use_ocr, only the pages without a usable text layer (scans) are
+    # OCR'd, so a mixed PDF keeps all of its pages
+    if pdfium is not None:
+        pages = iter_pdf_pages_with_ocr(path) if use_ocr else iter_pdf_text_pages(path)
+        parts: List[str] = []
+        try:
+            for page_text in pages:
                 if page_text.strip():
-                    text += page_text + "\n"
-            except Exception:
-                continue
-    except Exception:
-        text = ""
+                    parts.append(page_text)
+        except Exception:
+            # Keep the pages read before the failure
+            pass
+        text = "\n".join(parts)
+    elif PdfReader is not None:
+        parts = []
+        try:
+            reader = PdfReader(path)
+            for page in reader.pages:
+                try:
+                    page_text = page.extract_text() or ""
+                    if page_text.strip():
+                        parts.append(page_text)
+                except Exception:
+                    continue
+            text = "\n".join(parts)
+        except Exception:
+            text = ""
 
-    if not text.strip() and use_ocr:
+    # Without PDFium the whole document is OCR'd, only when it has no text
+    if pdfium is None and not text.strip() and use_ocr:
         try:
             text = pdf_to_text_via_ocr(path, dpi=200)
         except Exception:
             text = ""
 
     if not text.strip():
-        return (
-            "(error) Could not extract text from PDF. "
-            "This may be a scanned document or OCR/Poppler is not configured."
-        )
+        return _PDF_NO_TEXT
 
     return text.strip()
 
 
+# Cut the first chunk off text longer than max_chars at the break point
+# _chunk_text would choose; returns (chunk, rest)
+def _split_chunk(text: str, max_chars: int):
+    end = max_chars
+    cut = max(text.rfind("\n", 0, end), text.rfind(". ", 0, end))
+    if cut > int(max_chars * 0.5):
+        end = cut + 1
+    return text[:end].strip(), text[end:]
+
+
+# Yield chunks of a PDF's text as its pages are read, so summarizing can start
+# before the whole document has been extracted; chunk boundaries follow the
+# same rules as _chunk_text. Scanned pages are OCR'd as they are reached
+# (without PDFium the whole document is extracted first), and an
+# "(error) ..." message is yielded when no text can be found.
+def _iter_pdf_chunks(path: str, max_chars: int = 3800) -> Iterator[str]:
+    buf = ""
+    emitted = False
+
+    if pdfium is not None:
+        try:
+            for page_text in iter_pdf_pages_with_ocr(path):
+                if not page_text.strip():
+                    continue
+                buf = f"{buf}\n{page_text}" if buf else page_text.lstrip()
+
+                # Only cut once more text follows the window, as _chunk_text
+                # does; trailing whitespace may yet be the end of the document
+                while len(buf.rstrip()) > max_chars:
+                    chunk, buf = _split_chunk(buf, max_chars)
+                    if chunk:
+                        emitted = True
+                        yield chunk
+        except Exception:
+            # Keep what was read so far; with nothing read, fall back below
+            pass
+
+    buf = buf.rstrip()
+    while len(buf) > max_chars:
+        chunk, buf = _split_chunk(buf, max_chars)
+        if chunk:
+            emitted = True
+            yield chunk
+    if buf.strip():
+        yield buf.strip()
+        return
+    if emitted:
+        return
+    if pdfium is not None:
+        yield _PDF_NO_TEXT
+        return
+
+    text = extract_text_from_pdf(path, use_ocr=True)
+    if text.startswith("(error)"):
+        yield text
+        return
+    yield from _chunk_text(text, max_chars=max_chars)
+
+
 # Extract text from Microsoft Word documents
 def extract_text_from_docx(path: str) -> str:
+    if docx is None:
+        return ""
     try:
-        import docx
         doc = docx.Document(path)
         return "\n".join(p.text for p in doc.paragraphs).strip()
     except Exception:
@@ -95,8 +215,9 @@ def extract_text_from_txt(path: str) -> str:
 
 # Extract a short preview of CSV or Excel files
 def extract_text_from_csv_or_excel(path: str) -> str:
+    if pd is None:
+        return ""
     try:
-        import pandas as pd
         ext = os.path.splitext(path)[1].lower()
         if ext == ".csv":
             df = pd.read_csv(path)
@@ -119,82 +240,122 @@ def extract_text_from_image(path: str) -> str:
 
 
 # Summarize text using the model wrapper with safe fallback
-def summarize_text(text: str, bullets: int = 3) -> str:
+def summarize_text(text: str, bullets: int = 3, cache_scope: Optional[str] = None) -> str:
     if not text or not text.strip():
         return "(info) No text to summarize."
 
     try:
-        return _model.summarize(text, bullets=bullets)
+        return _model.summarize(text, bullets=bullets, cache_scope=cache_scope)
     except Exception as e:
         return f"(error) Summarization failed: {e}"
 
 
 # Extract keywords from text using the model wrapper
-def extract_keywords(text: str, top_k: int = 8) -> List[str]:
+def extract_keywords(text: str, top_k: int = 8, cache_scope: Optional[str] = None) -> List[str]:
     if not text or not text.strip():
         return []
 
     try:
-        return _model.keywords(text, top_k=top_k)
+        return _model.keywords(text, top_k=top_k, cache_scope=cache_scope)
     except Exception:
         return []
 
 
+# Summarize one chunk, returning (summary, error) so a failure stays per-chunk
+def _summarize_chunk(chunk: str, cache_scope: Optional[str] = None):
+    try:
+        return _model.summarize(chunk, bullets=2, cache_scope=cache_scope), None
+    except Exception as e:
+        return None, e
+
+
+# Summarize chunks concurrently (model calls are I/O-bound), yielding
+# (summary, error) pairs in chunk order. At most SUMMARIZE_CONCURRENCY chunks
+# are in flight and the next chunk is only pulled once the oldest is done, so
+# the first summary streams out while later pages are still being read
+# (Executor.map would drain the whole chunk generator up front)
+def _summarize_chunks(chunks, cache_scope: Optional[str] = None) -> Iterator[tuple]:
+    ex = ThreadPoolExecutor(max_workers=SUMMARIZE_CONCURRENCY)
+    chunks = iter(chunks)
+    window = collections.deque()
+    try:
+        for chunk in itertools.islice(chunks, SUMMARIZE_CONCURRENCY):
+            window.append(ex.submit(_summarize_chunk, chunk, cache_scope))
+        while window:
+            result = window.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                window.append(ex.submit(_summarize_chunk, chunk, cache_scope))
+            yield result
+    finally:
+        # A closed stream (client went away) drops chunks not yet started
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
 # Explain a PDF by summarizing chunks and synthesizing a final explanation
 def explain_pdf_text_only(
     path: str,
     bullets: int = 4,
-    chunk_max_chars: int = 3800
+    chunk_max_chars: int = 3800,
+    cache_scope: Optional[str] = None
 ) -> str:
-    text = extract_text_from_pdf(path, use_ocr=True)
-    if not text or text.startswith("(error)"):
-        return text
+    chunks = _iter_pdf_chunks(path, max_chars=chunk_max_chars)
+    first = next(chunks, "")
+    if not first or first.startswith("(error)"):
+        return first
+    chunks = itertools.chain([first], chunks)
 
-    chunks = _chunk_text(text, max_chars=chunk_max_chars)
     partials: List[str] = []
 
-    for i, chunk in enumerate(chunks, start=1):
-        try:
-            summary = _model.summarize(chunk, bullets=2)
+    for i, (summary, error) in enumerate(_summarize_chunks(chunks, cache_scope), start=1):
+        if error is None:
             partials.append(f"Part {i} summary:\n{summary}")
-        except Exception as e:
-            partials.append(f"Part {i} summary failed: {e}")
+        else:
+            partials.append(f"Part {i} summary failed: {error}")
 
     synth_source = "\n\n".join(partials)
 
     try:
-        return _model.explain_pdf_text(synth_source, bullets=bullets)
+        return _model.explain_pdf_text(synth_source, bullets=bullets, cache_scope=cache_scope)
     except Exception as e:
         return f"(error) Final explanation failed: {e}"
 
 
-# Backward-compatible PDF explanation helper returning partials and final output
-def explain_pdf(
+# Explain a PDF incrementally, yielding each partial summary as it completes
+def explain_pdf_stream(
     path: Optional[str] = None,
     text: Optional[str] = None,
     bullets: int = 4,
-    chunk_max_chars: int = 3800
-) -> Dict[str, Any]:
+    chunk_max_chars: int = 3800,
+    cache_scope: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
     if text is None:
         if not path:
-            return {
-                "partials": [],
-                "final": "(error) No PDF path or text provided."
-            }
-        text = extract_text_from_pdf(path, use_ocr=True)
-
-    if not text or text.startswith("(error)"):
-        return {"partials": [], "final": text}
-
-    chunks = _chunk_text(text, max_chars=chunk_max_chars)
-    partials: List[Dict[str, str]] = []
-
-    for i, chunk in enumerate(chunks, start=1):
-        try:
-            summary = _model.summarize(chunk, bullets=2)
-            partials.append({"part": i, "summary": summary})
-        except Exception as e:
-            partials.append({"part": i, "summary": f"(error) {e}"})
+            yield {"final": "(error) No PDF path or text provided."}
+            return
+
+        # Chunks are fed to the summarizer pool while later pages are read
+        chunks = _iter_pdf_chunks(path, max_chars=chunk_max_chars)
+        first = next(chunks, "")
+        if not first or first.startswith("(error)"):
+            yield {"final": first}
+            return
+        chunks = itertools.chain([first], chunks)
+    else:
+        if not text or text.startswith("(error)"):
+            yield {"final": text}
+            return
+        chunks = _chunk_text(text, max_chars=chunk_max_chars)
+
+    partials: List[Dict[str, Any]] = []
+
+    for i, (summary, error) in enumerate(_summarize_chunks(chunks, cache_scope), start=1):
+        if error is None:
+            part = {"part": i, "summary": summary}
+        else:
+            part = {"part": i, "summary": f"(error) {error}"}
+        partials.append(part)
+        yield {"partial": part}
 
     synth_source = "\n\n".join(
         f"Part {p['part']} summary:\n{p['summary']}"
@@ -202,8 +363,26 @@ def explain_pdf(
     )
 
     try:
-        final = _model.explain_pdf_text(synth_source, bullets=bullets)
+        final = _model.explain_pdf_text(synth_source, bullets=bullets, cache_scope=cache_scope)
     except Exception as e:
         final = f"(error) Explanation synthesis failed: {e}"
 
+    yield {"final": final}
+
+
+# Backward-compatible PDF explanation helper returning partials and final output
+def explain_pdf(
+    path: Optional[str] = None,
+    text: Optional[str] = None,
+    bullets: int = 4,
+    chunk_max_chars: int = 3800,
+    cache_scope: Optional[str] = None
+) -> Dict[str, Any]:
+    partials: List[Dict[str, Any]] = []
+    final = ""
+    for event in explain_pdf_stream(path, text, bullets, chunk_max_chars, cache_scope):
+        if "partial" in event:
+            partials.append(event["partial"])
+        else:
+            final = event["final"]
     return {"partials": partials, "final": final}